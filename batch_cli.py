@@ -0,0 +1,264 @@
+"""
+Headless batch renderer: renders every row of a CSV without the GUI.
+
+Runs Qt on the offscreen platform (no display, no widgets), so print runs can be triggered
+from cron or an ERP on a headless server:
+
+    python batch_cli.py products.csv -o /srv/tags --format pdf --size 4x3 --dpi 600
+
+A JSON summary of the run (settings, per-row results, skipped rows) is written to
+<out>/batch_summary.json, or wherever --summary points ("-" for stdout). --timings adds
+per-row stage timings and per-stage totals to it; --trace writes a Chrome trace-event file
+(open in chrome://tracing or ui.perfetto.dev).
+
+--archive zip|zip-deflated|tar writes one archive (named after the CSV) instead of a file per row.
+Re-running into the same folder resumes: rows whose output is recorded in
+<out>/batch_manifest.jsonl with the same content hash are skipped (--no-resume renders everything).
+Rows identical to an earlier row are rendered once and hard-linked or copied (--no-dedupe renders
+each); the summary counts them as renders_saved.
+Ctrl+C (SIGINT) or SIGTERM stops the batch after the rows being rendered; the summary lists
+what was done, and re-running resumes from there.
+
+Exit status:
+    0  every row rendered
+    1  the batch ran but some rows failed or were skipped as malformed
+    2  bad arguments or unusable CSV (missing file or required headers, not UTF-8, malformed)
+    3  the batch aborted on an unexpected error
+    4  the batch was cancelled (SIGINT/SIGTERM)
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+EXIT_OK = 0
+EXIT_ROWS_FAILED = 1
+EXIT_BAD_INPUT = 2
+EXIT_ABORTED = 3
+EXIT_CANCELLED = 4
+
+LAYOUTS = ("Vertical", "Horizontal")
+THEMES = ("Light", "Dark", "Industrial")
+FORMATS = ("png", "jpg", "pdf", "zpl")
+# utils.exporter.ENCODER_PROFILES (the exporter is imported only after Qt is set up)
+ENCODERS = ("lossless", "fast", "balanced", "smallest", "monochrome")
+# utils.batch_archive.ARCHIVE_FORMATS
+ARCHIVES = ("zip", "zip-deflated", "tar")
+# models.settings.PRINTER_DPIS
+PRINTER_DPIS = (203, 300, 600)
+
+# Offscreen Qt application of the run; this reference keeps it alive (it is destroyed once unreferenced)
+_app = None
+
+
+def _parse_size(value: str):
+    try:
+        w, h = (float(v) for v in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT in inches, e.g. 4x3, got {value!r}")
+    if w <= 0 or h <= 0:
+        raise argparse.ArgumentTypeError("width and height must be positive")
+    return w, h
+
+
+def _choice(options):
+    """Case-insensitive choice that returns the canonical spelling."""
+    by_lower = {o.lower(): o for o in options}
+
+    def parse(value: str):
+        try:
+            return by_lower[value.lower()]
+        except KeyError:
+            raise argparse.ArgumentTypeError(f"choose from {', '.join(options)}")
+    return parse
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Render product tags for every row of a CSV, without the GUI.")
+    parser.add_argument("csv", help="input CSV (see README for the columns)")
+    parser.add_argument("-o", "--out", required=True, help="output folder")
+    parser.add_argument("-f", "--format", type=_choice(FORMATS), default="png", help="png, jpg, pdf or zpl (default png); zpl writes one label stream named after the CSV")
+    parser.add_argument("--layout", type=_choice(LAYOUTS), default="Vertical", help="Vertical or Horizontal")
+    parser.add_argument("--theme", type=_choice(THEMES), default="Light", help="Light, Dark or Industrial")
+    parser.add_argument("--size", type=_parse_size, default=(4.0, 3.0), metavar="WxH",
+                        help="tag size in inches (default 4x3)")
+    parser.add_argument("--dpi", type=int, default=600, help="output resolution of png/jpg/pdf (default 600)")
+    parser.add_argument("--printer-dpi", type=int, choices=PRINTER_DPIS, default=203,
+                        help="with --format zpl, dot density of the Zebra printer: 203, 300 or 600 (default 203)")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="worker processes (default: one per CPU core)")
+    parser.add_argument("--single-pdf", action="store_true",
+                        help="with --format pdf, write one multi-page PDF named after the CSV")
+    parser.add_argument("--encoder", type=_choice(ENCODERS), default="lossless",
+                        help="PNG/JPEG encoder profile: lossless, fast, balanced, smallest or monochrome "
+                             "(default lossless)")
+    parser.add_argument("--archive", type=_choice(ARCHIVES), default=None,
+                        help="stream the png/jpg/pdf files into one zip (stored), zip-deflated or tar archive "
+                             "named after the CSV, with a manifest.jsonl member")
+    parser.add_argument("--logo", default="kii_logo.png", help="logo image (default kii_logo.png)")
+    parser.add_argument("--summary", default=None,
+                        help="where to write the JSON summary (default <out>/batch_summary.json, '-' for stdout)")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="render every row, even those already up to date in the output folder")
+    parser.add_argument("--no-dedupe", action="store_true",
+                        help="render every row, even rows identical to an earlier row of the CSV")
+    parser.add_argument("--progress", action="store_true",
+                        help="print rows done, rows/s, ETA and failures to stderr while running")
+    parser.add_argument("--timings", action="store_true", help="record per-row stage timings in the summary")
+    parser.add_argument("--trace", metavar="FILE", help="write a Chrome trace-event JSON of every stage")
+    return parser
+
+
+def _write_summary(summary: dict, target: str):
+    text = json.dumps(summary, indent=2)
+    if target == "-":
+        print(text)
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+    # Write then rename so a watcher never reads a half-written summary
+    tmp = target + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, target)
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.dpi <= 0:
+        print("error: --dpi must be positive", file=sys.stderr)
+        return EXIT_BAD_INPUT
+    if args.workers is not None and args.workers < 1:
+        print("error: --workers must be at least 1", file=sys.stderr)
+        return EXIT_BAD_INPUT
+    if args.archive and (args.format == "zpl" or (args.format == "pdf" and args.single_pdf)):
+        what = "--format zpl" if args.format == "zpl" else "--single-pdf"
+        print(f"error: --archive packs one file per row; it cannot be combined with {what}", file=sys.stderr)
+        return EXIT_BAD_INPUT
+
+    # User paths are taken relative to the caller's cwd; the renderers find their bundled assets
+    # (kii_logo.png, kiiqr.png) relative to the app folder, as they do for the GUI
+    args.csv, args.out = os.path.abspath(args.csv), os.path.abspath(args.out)
+    args.logo = os.path.abspath(args.logo) if os.path.exists(args.logo) else args.logo
+    summary_path = args.summary if args.summary == "-" else os.path.abspath(
+        args.summary or os.path.join(args.out, "batch_summary.json"))
+    trace_path = os.path.abspath(args.trace) if args.trace else None
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    # Must be set before Qt is first imported/initialised
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtGui import QGuiApplication
+    from utils.csv_batch import DUPLICATE_MESSAGE, UNCHANGED_MESSAGE, CsvRowStream, prefetch_rows, run_batch_parallel
+    from utils.profiling import StageRecorder
+
+    summary = {
+        "csv": args.csv,
+        "out_folder": args.out,
+        "format": args.format,
+        "layout": args.layout,
+        "theme": args.theme,
+        "size_inches": list(args.size),
+        "dpi": args.printer_dpi if args.format == "zpl" else args.dpi,
+        "encoder": args.encoder,
+        "workers": args.workers,
+        "single_pdf": args.single_pdf,
+        "archive": args.archive,
+        "started": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+    try:
+        rows = CsvRowStream(args.csv, on_error=lambda msg: print(f"skipped {msg}", file=sys.stderr))
+    except (OSError, UnicodeDecodeError, csv.Error) as ex:
+        rows = None
+        input_error = f"cannot read CSV: {ex}"
+    else:
+        input_error = rows.header_error
+    if input_error:
+        print(f"error: {input_error}", file=sys.stderr)
+        summary.update(exit_code=EXIT_BAD_INPUT, error=input_error)
+        _write_summary(summary, summary_path)
+        return EXIT_BAD_INPUT
+
+    global _app
+    _app = QGuiApplication.instance() or QGuiApplication([sys.argv[0]])
+    profiler = StageRecorder(trace=trace_path is not None) if args.timings or trace_path else None
+    cancel = threading.Event()
+
+    def request_cancel(signum, frame):
+        if not cancel.is_set():
+            print("cancelling after the rows in progress...", file=sys.stderr)
+        cancel.set()
+    signal.signal(signal.SIGINT, request_cancel)
+    signal.signal(signal.SIGTERM, request_cancel)
+    report = None
+    if args.progress:
+        report = lambda p: print(p.describe(rows.estimated_rows()), file=sys.stderr, flush=True)
+    # ZPL is laid out in printer dots, not at the raster resolution
+    dpi = args.printer_dpi if args.format == "zpl" else args.dpi
+    start = time.perf_counter()
+    try:
+        results = run_batch_parallel(prefetch_rows(rows), args.out, args.format, args.layout, args.theme,
+                                     args.size, dpi, args.logo, workers=args.workers,
+                                     single_pdf=args.single_pdf,
+                                     pdf_name=os.path.splitext(os.path.basename(args.csv))[0] + ".pdf",
+                                     profiler=profiler, resume=not args.no_resume, progress=report,
+                                     cancel=cancel, encoder_profile=args.encoder, archive=args.archive,
+                                     dedupe=not args.no_dedupe)
+    except (UnicodeDecodeError, csv.Error) as ex:
+        # Raised by the row stream past the header: the file itself is unusable, not the batch
+        error = f"cannot read CSV: {ex}"
+        print(f"error: {error}", file=sys.stderr)
+        summary.update(exit_code=EXIT_BAD_INPUT, error=error, elapsed_s=round(time.perf_counter() - start, 3))
+        _write_summary(summary, summary_path)
+        return EXIT_BAD_INPUT
+    except Exception as ex:
+        print(f"error: batch aborted: {ex}", file=sys.stderr)
+        summary.update(exit_code=EXIT_ABORTED, error=str(ex), elapsed_s=round(time.perf_counter() - start, 3))
+        _write_summary(summary, summary_path)
+        return EXIT_ABORTED
+
+    failed = sum(1 for _, ok, _, _ in results if not ok)
+    exit_code = EXIT_ROWS_FAILED if failed or rows.error_count else EXIT_OK
+    if cancel.is_set():
+        exit_code = EXIT_CANCELLED
+    summary.update(
+        exit_code=exit_code,
+        cancelled=cancel.is_set(),
+        elapsed_s=round(time.perf_counter() - start, 3),
+        rows_ok=len(results) - failed,
+        rows_failed=failed,
+        rows_unchanged=sum(1 for _, _, msg, _ in results if msg == UNCHANGED_MESSAGE),
+        renders_saved=sum(1 for _, _, msg, _ in results if msg == DUPLICATE_MESSAGE),
+        rows_skipped=rows.error_count,
+        skipped=rows.errors,
+        results=[{"path": path, "ok": ok, "message": msg} for path, ok, msg, _ in results],
+    )
+    if args.timings:
+        totals = {}
+        for entry, (_, _, _, timings) in zip(summary["results"], results):
+            entry["timings_ms"] = timings
+            for name, ms in (timings or {}).items():
+                totals[name] = totals.get(name, 0.0) + ms
+        # Stages nest (e.g. render contains qr_paint), so totals overlap
+        summary["stage_totals_ms"] = {name: round(ms, 3) for name, ms in sorted(totals.items(), key=lambda t: -t[1])}
+        for name, ms in summary["stage_totals_ms"].items():
+            print(f"  {name:<16}{ms:>12.1f} ms", file=sys.stderr)
+    if trace_path:
+        profiler.write_chrome_trace(trace_path)
+        summary["trace"] = trace_path
+    _write_summary(summary, summary_path)
+    print(f"{summary['rows_ok']} ok ({summary['rows_unchanged']} unchanged, {summary['renders_saved']} duplicates), "
+          f"{failed} failed, {rows.error_count} skipped in {summary['elapsed_s']} s",
+          file=sys.stderr)
+    return exit_code
+
+
+if __name__ == "__main__":
+    # Batch worker processes are spawned; required for frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Shared helpers for the benchmark scripts: offscreen Qt setup, repo-root imports and timing.
+Run benchmarks from the project root, e.g. `python benchmarks/bench_qimage_to_pil.py`.
+"""
+import os
+import statistics
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+SAMPLE_PRODUCT = {
+    "product_name": "Hydraulic Pump Assembly",
+    "part_number": "KII-HP-20931",
+    "qc_status": "Approved",
+    "made_in": "Made in Kurdistan – Iraq",
+    "catalog_url": "https://example.com/catalog/KII-HP-20931",
+}
+
+
+def ensure_app():
+    """Create an offscreen QGuiApplication (fonts and painting need one) and chdir to the repo root."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    os.chdir(ROOT)
+    from PySide6.QtGui import QGuiApplication
+    return QGuiApplication.instance() or QGuiApplication(sys.argv[:1])
+
+
+def timeit(fn, repeat: int = 5, warmup: int = 1) -> dict:
+    """Run fn repeatedly; return min/median/mean wall time in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return {
+        "min_ms": round(min(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "repeat": repeat,
+    }
+
+
+def _rss_bytes() -> int:
+    """Current resident set size; 0 where it cannot be read cheaply (non-Linux)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+class PeakRSS:
+    """
+    Context manager sampling the process RSS every `interval` seconds on a background thread.
+    Qt and Pillow allocate outside the Python heap, so tracemalloc would miss most image memory.
+    After exit: peak_mb (highest RSS seen) and delta_mb (peak minus RSS at entry).
+    """
+
+    def __init__(self, interval: float = 0.002):
+        self.interval = interval
+        self.start = self.peak = 0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _rss_bytes())
+
+    def __enter__(self):
+        self.start = self.peak = _rss_bytes()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_bytes())
+
+    @property
+    def peak_mb(self) -> float:
+        return round(self.peak / 2 ** 20, 1)
+
+    @property
+    def delta_mb(self) -> float:
+        return round((self.peak - self.start) / 2 ** 20, 1)
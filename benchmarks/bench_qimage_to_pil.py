@@ -0,0 +1,81 @@
+"""
+Compare the direct-buffer qimage_to_pil against the previous PNG round-trip, alone and
+inside each export format.
+
+    python benchmarks/bench_qimage_to_pil.py [--dpi 600] [--repeat 5]
+"""
+import argparse
+import io
+import os
+import tempfile
+
+from _common import SAMPLE_PRODUCT, ensure_app, timeit
+
+
+def legacy_qimage_to_pil(qimage):
+    """Previous conversion: encode PNG into a QBuffer and decode it again with Pillow."""
+    from PySide6.QtCore import QBuffer, QByteArray, QIODevice
+    from PIL import Image
+    ba = QByteArray()
+    buf = QBuffer(ba)
+    buf.open(QIODevice.WriteOnly)
+    qimage.save(buf, "PNG")
+    buf.close()
+    return Image.open(io.BytesIO(bytes(ba))).convert("RGBA")
+
+
+def legacy_export(qimage, path, fmt, output_inches, dpi):
+    """Previous export pipelines, including the extra PNG encode in front of reportlab."""
+    pil = legacy_qimage_to_pil(qimage)
+    if fmt == "png":
+        pil.save(path, format="PNG", dpi=(dpi, dpi))
+    elif fmt == "jpg":
+        pil.convert("RGB").save(path, format="JPEG", dpi=(dpi, dpi), quality=95)
+    else:
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.units import inch
+        from reportlab.lib.utils import ImageReader
+        buf = io.BytesIO()
+        pil.save(buf, format="PNG", dpi=(dpi, dpi))
+        buf.seek(0)
+        w_in, h_in = output_inches
+        c = canvas.Canvas(path, pagesize=(w_in * inch, h_in * inch))
+        c.drawImage(ImageReader(buf), 0, 0, width=w_in * inch, height=h_in * inch, preserveAspectRatio=True, mask="auto")
+        c.showPage()
+        c.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dpi", type=int, default=600)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    ensure_app()
+    from utils.exporter import render_tag_image, qimage_to_pil, export_png_qimage, export_jpg_qimage, export_pdf
+
+    output_inches = (4.0, 3.0)
+    qimage = render_tag_image(SAMPLE_PRODUCT, output_inches=output_inches, dpi=args.dpi)
+    print(f"Tag {qimage.width()}x{qimage.height()} px @ {args.dpi} DPI, best of {args.repeat}")
+
+    rows = [("convert", timeit(lambda: legacy_qimage_to_pil(qimage), args.repeat),
+             timeit(lambda: qimage_to_pil(qimage), args.repeat))]
+    exporters = {
+        "png": lambda p: export_png_qimage(qimage, p, dpi=args.dpi),
+        "jpg": lambda p: export_jpg_qimage(qimage, p, dpi=args.dpi),
+        "pdf": lambda p: export_pdf(qimage, p, output_inches=output_inches, dpi=args.dpi),
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt, export in exporters.items():
+            path = os.path.join(tmp, f"tag.{fmt}")
+            rows.append((f"export {fmt}",
+                         timeit(lambda: legacy_export(qimage, path, fmt, output_inches, args.dpi), args.repeat),
+                         timeit(lambda: export(path), args.repeat)))
+
+    print(f"{'stage':<12}{'png round-trip':>16}{'direct buffer':>16}{'speedup':>10}")
+    for name, old, new in rows:
+        print(f"{name:<12}{old['min_ms']:>13.1f} ms{new['min_ms']:>13.1f} ms{old['min_ms'] / new['min_ms']:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Desktop app startup: import time, window construction, first paint and first preview.
+
+Each run is a fresh interpreter (imports are only cold once per process); medians are reported.
+
+    python benchmarks/bench_startup.py [--runs 5] [--json startup.json] [--budget-ms 1500]
+
+first_paint is the window's first event-loop pass after show(); first_preview is when the
+rendered preview reaches the window. With --budget-ms the script exits 1 if the median
+first_preview exceeds the budget, so it can guard startup in CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from _common import ROOT
+
+STAGES = ("import_qt_ms", "import_app_ms", "window_ms", "first_paint_ms", "first_preview_ms")
+# Modules that should not be loaded before the first preview is requested
+HEAVY_MODULES = ("reportlab", "validators", "utils.pdf_vector", "utils.csv_batch", "concurrent.futures")
+
+
+def child():
+    """One cold start; prints a JSON line of cumulative timings (ms since the script started)."""
+    t0 = time.perf_counter()
+    ms = lambda: round((time.perf_counter() - t0) * 1000.0, 1)
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    os.chdir(ROOT)
+    result = {}
+
+    from PySide6.QtWidgets import QApplication
+    result["import_qt_ms"] = ms()
+    app = QApplication(sys.argv[:1])
+    from views.main_window import MainWindow
+    result["import_app_ms"] = ms()
+
+    show_preview = MainWindow.set_preview_qimage
+
+    def first_preview(self, qimage, output_px=None):
+        show_preview(self, qimage, output_px)
+        result.setdefault("first_preview_ms", ms())
+        app.quit()
+    MainWindow.set_preview_qimage = first_preview
+
+    window = MainWindow()
+    result["window_ms"] = ms()
+    window.show()
+    app.processEvents()
+    result["first_paint_ms"] = ms()
+    result["heavy_modules_at_first_paint"] = [m for m in HEAVY_MODULES if m in sys.modules]
+    if "first_preview_ms" not in result:
+        app.exec()
+    window.close()
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--budget-ms", type=float, help="fail if the median first_preview exceeds this")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return 0
+
+    runs = []
+    for _ in range(args.runs):
+        t0 = time.perf_counter()
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"],
+                             capture_output=True, text=True, check=True).stdout
+        run = json.loads(out.strip().splitlines()[-1])
+        run["process_ms"] = round((time.perf_counter() - t0) * 1000.0, 1)
+        runs.append(run)
+
+    summary = {stage: statistics.median(r[stage] for r in runs) for stage in STAGES + ("process_ms",)}
+    print(f"Cold start, median of {args.runs} runs (ms since script start)")
+    for stage in STAGES:
+        print(f"  {stage[:-3]:<16}{summary[stage]:>9.1f}")
+    print(f"  {'process total':<16}{summary['process_ms']:>9.1f}  (incl. interpreter start and exit)")
+    heavy = sorted({m for r in runs for m in r["heavy_modules_at_first_paint"]})
+    print(f"  heavy modules loaded at first paint: {', '.join(heavy) or 'none'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"median": summary, "runs": runs, "heavy_modules_at_first_paint": heavy}, f, indent=2)
+    if args.budget_ms is not None and summary["first_preview_ms"] > args.budget_ms:
+        print(f"first preview {summary['first_preview_ms']:.1f} ms exceeds budget {args.budget_ms:.1f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
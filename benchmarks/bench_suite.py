@@ -0,0 +1,215 @@
+"""
+Benchmark suite: QR generation, rendering, conversion, every export and batch throughput,
+across DPI, layouts, themes and tag sizes. Runs offscreen.
+
+    python benchmarks/bench_suite.py --output bench.json
+    python benchmarks/bench_suite.py --quick --baseline bench.json --threshold 0.15
+
+Each case records min/median/mean wall time and the peak process RSS while it ran; encoder
+cases (PNG/JPEG per encoder profile) also record the output size.
+With --baseline, cases whose median is more than --threshold slower than the stored result
+are reported as regressions and the script exits 1. --filter keeps cases whose id contains
+the given text, e.g. --filter render_tag_image or --filter @600.
+
+Every render uses a different part number, as rows of a real batch would, so per-product QR
+work is included; configuration-level caches (layout plan, static layer, scaled logos) are
+warm after the first iteration, as they are in a batch.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from _common import ROOT, SAMPLE_PRODUCT, PeakRSS, ensure_app, timeit
+
+DPIS = (150, 300, 600, 1200)
+LAYOUTS = ("Vertical", "Horizontal")
+THEMES = ("Light", "Dark", "Industrial")
+SIZES = ((4.0, 3.0), (2.0, 1.0), (6.0, 4.0))
+BATCH_FORMATS = ("png", "jpg", "pdf")
+
+_serial = itertools.count()
+
+
+def _product():
+    """SAMPLE_PRODUCT with a fresh part number, so QR matrices are not served from cache."""
+    n = next(_serial)
+    return dict(SAMPLE_PRODUCT, part_number=f"KII-HP-{n:06d}", catalog_url=f"https://example.com/catalog/{n}")
+
+
+def _size_id(size) -> str:
+    return f"{size[0]:g}x{size[1]:g}"
+
+
+def build_cases(args, tmp: str):
+    """Yield (case_id, params, fn). Imports happen here, after the offscreen app exists."""
+    from utils.csv_batch import run_batch
+    from utils.exporter import (ENCODER_PROFILES, build_qr_pil_for_product, export_jpg_qimage, export_pdf,
+                                export_png_qimage, qimage_to_pil, render_tag_image, tag_geometry)
+    from utils.pdf_vector import export_pdf_vector
+    from utils.qr_generator import generate_qr
+
+    dpis = (150, 300) if args.quick else DPIS
+    sizes = SIZES[:1] if args.quick else SIZES
+    themes = THEMES[:2] if args.quick else THEMES
+
+    for dpi, size in itertools.product(dpis, sizes):
+        base = {"dpi": dpi, "size": _size_id(size)}
+        # QR bitmaps at the side the Vertical layout gives them at this size and DPI
+        qr_side = tag_geometry("Vertical", int(size[0] * dpi), int(size[1] * dpi)).qr_rect[2]
+        yield (f"generate_qr/qr_px={qr_side}/{_size_id(size)}@{dpi}", dict(base, qr_px=qr_side),
+               lambda qr_side=qr_side: generate_qr(f"Part Number: {next(_serial)}", size_pixels=qr_side,
+                                                   logo_path="kiiqr.png"))
+        yield (f"build_qr_pil_for_product/qr_px={qr_side}/{_size_id(size)}@{dpi}", dict(base, qr_px=qr_side),
+               lambda qr_side=qr_side: build_qr_pil_for_product(_product(), qr_pixels=qr_side))
+
+        for layout, theme in itertools.product(LAYOUTS, themes):
+            params = dict(base, layout=layout, theme=theme)
+            yield (f"render_tag_image/{layout}/{theme}/{_size_id(size)}@{dpi}", params,
+                   lambda layout=layout, theme=theme, size=size, dpi=dpi: render_tag_image(
+                       _product(), layout=layout, theme=theme, output_inches=size, dpi=dpi))
+
+        # Conversion and exports of one rendered tag (layout and theme do not change their cost), as
+        # (case_id, params, fn(qimage)); the tag is rendered only if --filter keeps one of them
+        stem = os.path.join(tmp, f"tag_{_size_id(size)}_{dpi}")
+        on_qimage = [
+            (f"qimage_to_pil/{_size_id(size)}@{dpi}", base, qimage_to_pil),
+            (f"export_png_qimage/{_size_id(size)}@{dpi}", base,
+             lambda q, dpi=dpi, stem=stem: export_png_qimage(q, stem + ".png", dpi=dpi)),
+            (f"export_jpg_qimage/{_size_id(size)}@{dpi}", base,
+             lambda q, dpi=dpi, stem=stem: export_jpg_qimage(q, stem + ".jpg", dpi=dpi)),
+        ]
+        for name, profile in ENCODER_PROFILES.items():
+            for fmt, export in (("png", export_png_qimage), ("jpg", export_jpg_qimage)):
+                path = f"{stem}_{name}.{fmt}"
+                on_qimage.append((f"encoder/{fmt}/{name}/{_size_id(size)}@{dpi}",
+                                  dict(base, profile=name, output_path=path),
+                                  lambda q, dpi=dpi, path=path, export=export, profile=profile: export(
+                                      q, path, dpi=dpi, profile=profile)))
+        on_qimage.append((f"export_pdf/{_size_id(size)}@{dpi}", base,
+                          lambda q, size=size, dpi=dpi, stem=stem: export_pdf(q, stem + ".pdf", output_inches=size,
+                                                                              dpi=dpi)))
+        on_qimage = [case for case in on_qimage if args.filter in case[0]]
+        if on_qimage:
+            qimage = render_tag_image(SAMPLE_PRODUCT, output_inches=size, dpi=dpi)
+            for case_id, params, fn in on_qimage:
+                yield case_id, params, lambda fn=fn, q=qimage: fn(q)
+            del qimage
+        for layout in LAYOUTS:
+            yield (f"export_pdf_vector/{layout}/{_size_id(size)}@{dpi}", dict(base, layout=layout),
+                   lambda layout=layout, size=size, dpi=dpi, stem=stem: export_pdf_vector(
+                       _product(), stem + "_vector.pdf", layout=layout, output_inches=size, dpi=dpi))
+
+    # End-to-end batch throughput (rows per second) at the default tag size
+    for fmt in BATCH_FORMATS:
+        for dpi in dpis[:2]:
+            out = os.path.join(tmp, f"batch_{fmt}_{dpi}")
+            yield (f"run_batch/{fmt}/rows={args.batch_rows}/4x3@{dpi}",
+                   {"dpi": dpi, "format": fmt, "rows": args.batch_rows},
+                   lambda fmt=fmt, dpi=dpi, out=out: run_batch([_product() for _ in range(args.batch_rows)], out, fmt,
+                                                               "Vertical", "Light", (4.0, 3.0), dpi))
+
+
+def run_case(fn, params, repeat: int) -> dict:
+    params = dict(params)
+    output_path = params.pop("output_path", None)
+    with PeakRSS() as mem:
+        timing = timeit(fn, repeat=repeat, warmup=1)
+    result = dict(params, **timing, peak_rss_mb=mem.peak_mb, rss_delta_mb=mem.delta_mb)
+    if output_path:
+        result["output_kb"] = round(os.path.getsize(output_path) / 1024, 1)
+    if "rows" in params:
+        result["rows_per_s"] = round(params["rows"] / (timing["median_ms"] / 1000.0), 2)
+    return result
+
+
+def environment() -> dict:
+    import PySide6
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pyside6": PySide6.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_ms: float = 1.0):
+    """
+    (regressions, improvements) as lists of (case_id, baseline_ms, current_ms, ratio).
+    Cases faster than min_ms in both runs are too noisy to judge and are skipped.
+    """
+    regressions, improvements = [], []
+    for case_id, current in results.items():
+        before = baseline.get(case_id)
+        if not before or max(before["median_ms"], current["median_ms"]) < min_ms:
+            continue
+        ratio = current["median_ms"] / before["median_ms"]
+        row = (case_id, before["median_ms"], current["median_ms"], ratio)
+        if ratio > 1 + threshold:
+            regressions.append(row)
+        elif ratio < 1 - threshold:
+            improvements.append(row)
+    return regressions, improvements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--quick", action="store_true", help="150/300 DPI, one tag size, two themes")
+    parser.add_argument("--filter", default="", help="only run cases whose id contains this text")
+    parser.add_argument("--batch-rows", type=int, default=20, help="rows per run_batch case")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="relative slowdown of the median that counts as a regression (default 0.15)")
+    parser.add_argument("--min-ms", type=float, default=1.0,
+                        help="ignore cases faster than this in both runs when comparing (default 1.0)")
+    args = parser.parse_args()
+
+    ensure_app()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for case_id, params, fn in build_cases(args, tmp):
+            if args.filter not in case_id:
+                continue
+            results[case_id] = run_case(fn, params, args.repeat)
+            r = results[case_id]
+            extra = f"  {r['rows_per_s']:>8.1f} rows/s" if "rows_per_s" in r else ""
+            extra += f"  {r['output_kb']:>8.1f} KB" if "output_kb" in r else ""
+            print(f"{case_id:<58}{r['median_ms']:>10.2f} ms  peak {r['peak_rss_mb']:>7.1f} MB{extra}", flush=True)
+
+    report = {"environment": environment(), "args": vars(args), "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions, improvements = compare(results, baseline, args.threshold, args.min_ms)
+        for title, rows in (("Regressions", regressions), ("Improvements", improvements)):
+            if rows:
+                print(f"\n{title} (median, threshold {args.threshold:.0%}):")
+                for case_id, before, now, ratio in sorted(rows, key=lambda r: -abs(r[3] - 1)):
+                    print(f"  {case_id:<58}{before:>10.2f} -> {now:>10.2f} ms  ({ratio - 1:+.0%})")
+        if regressions:
+            return 1
+        print(f"\nNo regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
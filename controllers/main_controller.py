@@ -1,19 +1,36 @@
 """
 Controller: connects UI events with model & utils.
 Ensures layout state is normalized and preview refresh is immediate on layout change.
+Preview renders run on a background thread (PreviewRenderService) so typing never blocks the UI.
+The PDF and ZPL backends and the batch engine are imported on first use to keep startup light.
 """
+import csv
+import threading
+
 from PySide6.QtCore import Slot, QThread, Signal, QObject
+from PySide6.QtGui import QImage
 from models.product import Product
 from models.settings import AppSettings
-from utils.exporter import render_tag_image, export_png_qimage, export_jpg_qimage, export_pdf
-from utils.csv_batch import read_csv, run_batch
+from utils.exporter import (render_tag_image, IncrementalPreviewRenderer, encoder_profile, export_png_qimage,
+                            export_jpg_qimage)
 import os
 
 class BatchWorker(QObject):
+    """
+    Runs a batch on its own thread. rows is a list or a CsvRowStream; a stream is parsed on a
+    prefetch thread while rendering runs, and its row errors are emitted (row_error) as they are
+    found and added to the results as failures. finished is always emitted: an error that aborts
+    the batch comes back as a failed result.
+    progress carries a percentage and a rows/s, ETA and failures line, a few times per second.
+    cancel() may be called from any thread; the batch stops after the rows being exported and
+    finished delivers the partial results (check `cancelled`).
+    """
     finished = Signal(list)
-    progress = Signal(int)
+    progress = Signal(int, str)
+    row_error = Signal(str)
 
-    def __init__(self, rows, out_folder, output_format, layout, theme, output_inches, dpi, logo_path):
+    def __init__(self, rows, out_folder, output_format, layout, theme, output_inches, dpi, logo_path,
+                 single_pdf=False, pdf_name="tags.pdf", workers=1, encoder_profile=None, archive=None):
         super().__init__()
         self.rows = rows
         self.out_folder = out_folder
@@ -23,18 +40,129 @@ class BatchWorker(QObject):
         self.output_inches = output_inches
         self.dpi = dpi
         self.logo_path = logo_path
+        self.single_pdf = single_pdf
+        self.pdf_name = pdf_name
+        self.workers = workers
+        self.encoder_profile = encoder_profile
+        self.archive = archive
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
 
     def run(self):
-        results = []
-        total = len(self.rows)
-        for idx, r in enumerate(self.rows):
-            res = run_batch([r], self.out_folder, self.output_format, self.layout, self.theme, self.output_inches, self.dpi, self.logo_path)
-            results.extend(res)
-            self.progress.emit(int(((idx+1)/total)*100))
+        from utils.csv_batch import CsvRowStream, prefetch_rows, run_batch_parallel
+        if isinstance(self.rows, CsvRowStream):
+            stream = self.rows
+            stream.on_error = self.row_error.emit
+            rows = prefetch_rows(stream)
+            # Total is unknown until the file is parsed; extrapolate from what has been read
+            total = lambda: max(1, stream.estimated_rows())
+        else:
+            stream = None
+            rows = self.rows
+            total = lambda: max(1, len(rows))
+
+        def report(p):
+            estimate = total()
+            self.progress.emit(min(99, p.done * 100 // estimate), p.describe(estimate))
+
+        try:
+            results = run_batch_parallel(rows, self.out_folder, self.output_format, self.layout, self.theme,
+                                         self.output_inches, self.dpi, self.logo_path, workers=self.workers,
+                                         single_pdf=self.single_pdf, pdf_name=self.pdf_name,
+                                         progress=report, cancel=self._cancel,
+                                         encoder_profile=self.encoder_profile, archive=self.archive)
+        except Exception as ex:
+            # A CSV that stops decoding partway, an unwritable output folder or archive: the window
+            # stays disabled until finished is emitted, so report it as a failure instead of raising
+            source = stream.filepath if stream is not None else self.out_folder
+            results = [(source, False, f"Batch aborted: {ex}", None)]
+        if stream is not None:
+            results.extend((stream.filepath, False, err, None) for err in stream.errors)
+            if stream.error_count > len(stream.errors):
+                results.append((stream.filepath, False,
+                                f"{stream.error_count - len(stream.errors)} more malformed rows", None))
         self.finished.emit(results)
 
-class MainController:
+class PreviewRenderWorker(QObject):
+    """
+    Lives on the preview thread. Holds only the most recent job: submitting while a render is
+    in progress replaces the pending job, so a burst of edits collapses into one render.
+    Renders are incremental: a field edit repaints only the affected rows (and the QR when
+    its payload changes) on the previous image.
+    """
+    rendered = Signal(int, QImage, object)
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._pending = None
+        self._renderer = IncrementalPreviewRenderer()
+
+    def submit(self, generation: int, job: dict):
+        with self._lock:
+            self._pending = (generation, job)
+
+    @Slot()
+    def process(self):
+        with self._lock:
+            pending, self._pending = self._pending, None
+        if pending is None:
+            # Already handled by an earlier wake-up in the same burst
+            return
+        generation, job = pending
+        output_px = job.pop("output_px")
+        qimage = self._renderer.render(**job)
+        self.rendered.emit(generation, qimage, output_px)
+
+
+class PreviewRenderService(QObject):
+    """
+    Background preview renderer. request() never blocks; `ready` fires on the GUI thread with
+    the image for the latest request only — results for superseded requests are dropped.
+    """
+    ready = Signal(QImage, object)
+    _wake = Signal()
+
+    def __init__(self):
+        super().__init__()
+        self._generation = 0
+        self._thread = QThread()
+        self._worker = PreviewRenderWorker()
+        self._worker.moveToThread(self._thread)
+        self._wake.connect(self._worker.process)
+        self._worker.rendered.connect(self._on_rendered)
+        self._thread.start()
+
+    def request(self, **job):
+        self._generation += 1
+        self._worker.submit(self._generation, job)
+        self._wake.emit()
+
+    @Slot(int, QImage, object)
+    def _on_rendered(self, generation: int, qimage: QImage, output_px):
+        if generation != self._generation:
+            return
+        self.ready.emit(qimage, output_px)
+
+    def shutdown(self):
+        self._thread.quit()
+        self._thread.wait()
+
+
+class MainController(QObject):
+    """
+    A QObject living on the GUI thread, so signals from the batch thread connected to its
+    methods are delivered (queued) on the GUI thread.
+    """
+
     def __init__(self, view):
+        super().__init__()
         self.view = view
         self.model = Product()
         self.settings = AppSettings()
@@ -44,6 +172,15 @@ class MainController:
         self.dpi = self.settings.get_dpi()
         self.default_format = self.settings.get_default_format()
         self.default_output_folder = self.settings.get_default_output_folder() or os.path.expanduser("~")
+        self.batch_single_pdf = self.settings.get_batch_single_pdf()
+        self.batch_workers = self.settings.get_batch_workers()
+        self.encoder_profile = self.settings.get_encoder_profile()
+        self.batch_archive = self.settings.get_batch_archive()
+        self.printer_dpi = self.settings.get_printer_dpi()
+        self._batch_thread = None
+        self._batch_worker = None
+        self.preview_service = PreviewRenderService()
+        self.preview_service.ready.connect(self.view.set_preview_qimage)
 
     def update_model_from_view(self):
         self.model.product_name = self.view.product_name_input.text().strip()
@@ -71,12 +208,17 @@ class MainController:
             "made_in": self.model.made_in,
             "catalog_url": self.model.catalog_url,
         }
-        # Render with explicit layout and dpi/settings
-        qimage = render_tag_image(product_dict, layout=self.layout, theme=self.theme,
-                                  output_inches=self.output_size_inches, dpi=self.dpi)
-        self.view.set_preview_qimage(qimage)
+        # Preview renders at widget resolution on the preview thread; the full-DPI render is
+        # reserved for export. The finished image arrives via preview_service.ready.
+        target_w, target_h, dpr = self.view.preview_target_size()
+        w_in, h_in = self.output_size_inches
+        self.preview_service.request(product=product_dict, target_size=(target_w, target_h),
+                                     layout=self.layout, theme=self.theme,
+                                     output_inches=self.output_size_inches, dpi=self.dpi,
+                                     zoom=self.view.preview_zoom(), device_pixel_ratio=dpr,
+                                     output_px=(int(w_in * self.dpi), int(h_in * self.dpi)))
 
-    def on_layout_changed(self, layout_name: str):
+    def on_layout_changed(self, layout_name: str, refresh: bool = True):
         # normalize layout name and store
         if not layout_name:
             return
@@ -85,25 +227,41 @@ class MainController:
             name = "Vertical"
         self.layout = name
         # Immediately re-render preview with new layout
-        self.on_form_changed()
+        if refresh:
+            self.on_form_changed()
 
     def on_theme_changed(self, theme_name: str):
         self.theme = theme_name
         self.view.apply_theme(theme_name)
         self.on_form_changed()
 
+    def shutdown(self):
+        self.preview_service.shutdown()
+
     def open_settings(self):
         self.view.show_settings_dialog(self.settings)
 
-    def save_settings(self, width: float, height: float, dpi: int, default_format: str, default_folder: str):
+    def save_settings(self, width: float, height: float, dpi: int, default_format: str, default_folder: str,
+                      batch_single_pdf: bool = False, batch_workers: int = 1, encoder_profile: str = "lossless",
+                      batch_archive=None, printer_dpi: int = 203):
         self.settings.set_output_size(width, height)
         self.settings.set_dpi(dpi)
         self.settings.set_default_format(default_format)
         self.settings.set_default_output_folder(default_folder)
+        self.settings.set_batch_single_pdf(batch_single_pdf)
+        self.settings.set_batch_workers(batch_workers)
+        self.settings.set_encoder_profile(encoder_profile)
+        self.settings.set_batch_archive(batch_archive)
+        self.settings.set_printer_dpi(printer_dpi)
         self.output_size_inches = (width, height)
         self.dpi = dpi
         self.default_format = default_format
         self.default_output_folder = default_folder
+        self.batch_single_pdf = batch_single_pdf
+        self.batch_workers = batch_workers
+        self.encoder_profile = encoder_profile
+        self.batch_archive = batch_archive
+        self.printer_dpi = printer_dpi
         self.on_form_changed()
 
     def export(self, file_path: str, fmt: str, output_inches=None, dpi=None):
@@ -113,7 +271,8 @@ class MainController:
             self.view.show_error_dialog(msg)
             return False
         output_inches = output_inches or self.output_size_inches
-        dpi = dpi or self.dpi
+        # ZPL is laid out in printer dots, so it uses the printer's resolution, not the raster DPI
+        dpi = dpi or (self.printer_dpi if fmt.lower() == "zpl" else self.dpi)
         product_dict = {
             "product_name": self.model.product_name,
             "part_number": self.model.part_number,
@@ -121,15 +280,24 @@ class MainController:
             "made_in": self.model.made_in,
             "catalog_url": self.model.catalog_url,
         }
-        qimage = render_tag_image(product_dict, layout=self.layout, theme=self.theme,
-                                  output_inches=output_inches, dpi=dpi)
         try:
-            if fmt.lower() == "png":
-                export_png_qimage(qimage, file_path, dpi=dpi)
-            elif fmt.lower() in ("jpg","jpeg"):
-                export_jpg_qimage(qimage, file_path, dpi=dpi)
-            elif fmt.lower() == "pdf":
-                export_pdf(qimage, file_path, output_inches=output_inches, dpi=dpi)
+            if fmt.lower() == "pdf":
+                from utils.pdf_vector import export_pdf_vector
+                export_pdf_vector(product_dict, file_path, layout=self.layout, theme=self.theme,
+                                  output_inches=output_inches, dpi=dpi)
+            elif fmt.lower() == "zpl":
+                from utils.zpl import export_zpl
+                export_zpl(product_dict, file_path, layout=self.layout, theme=self.theme,
+                           output_inches=output_inches, dpi=dpi)
+            elif fmt.lower() in ("png", "jpg", "jpeg"):
+                qimage = render_tag_image(product_dict, layout=self.layout, theme=self.theme,
+                                          output_inches=output_inches, dpi=dpi)
+                if fmt.lower() == "png":
+                    export_png_qimage(qimage, file_path, dpi=dpi,
+                                      profile=encoder_profile(self.encoder_profile, self.theme))
+                else:
+                    export_jpg_qimage(qimage, file_path, dpi=dpi,
+                                      profile=encoder_profile(self.encoder_profile, self.theme))
             else:
                 self.view.show_error_dialog(f"Unsupported export format: {fmt}")
                 return False
@@ -140,20 +308,44 @@ class MainController:
             return False
 
     def import_csv_and_run(self, csv_path: str, out_folder: str, output_format: str):
-        rows, errors = read_csv(csv_path)
-        if errors:
-            self.view.show_error_dialog("\n".join(errors))
+        # Rows are streamed: rendering starts as soon as the first row is parsed, and malformed
+        # rows are reported while the batch runs instead of aborting it
+        from utils.csv_batch import CsvRowStream
+        try:
+            rows = CsvRowStream(csv_path)
+        except (OSError, UnicodeDecodeError, csv.Error) as ex:
+            self.view.show_error_dialog(f"Cannot read CSV: {ex}")
+            self.view.setEnabled(True)
+            return
+        if rows.header_error:
+            self.view.show_error_dialog(rows.header_error)
+            self.view.setEnabled(True)
             return
-        worker = BatchWorker(rows, out_folder, output_format, self.layout, self.theme, self.output_size_inches, self.dpi, logo_path="kii_logo.png")
+        # Combined PDF, ZPL stream and archive are named after the CSV they came from
+        pdf_name = os.path.splitext(os.path.basename(csv_path))[0] + ".pdf"
+        fmt = output_format.lower()
+        # A combined PDF or ZPL stream is already one file; the archive applies to per-row files
+        archive = None if fmt == "zpl" or (fmt == "pdf" and self.batch_single_pdf) else self.batch_archive
+        dpi = self.printer_dpi if fmt == "zpl" else self.dpi
+        worker = BatchWorker(rows, out_folder, output_format, self.layout, self.theme, self.output_size_inches, dpi,
+                             logo_path="kii_logo.png", single_pdf=self.batch_single_pdf, pdf_name=pdf_name,
+                             workers=self.batch_workers, encoder_profile=self.encoder_profile, archive=archive)
         thread = QThread()
         worker.moveToThread(thread)
         thread.started.connect(worker.run)
-        worker.finished.connect(lambda results: self._on_batch_finished(results, thread, worker))
+        # A bound slot of this GUI-thread object, not a lambda: a lambda has no receiver and would
+        # run on the batch thread, which then waits on itself and touches widgets off the GUI thread
+        worker.finished.connect(self._on_batch_finished)
         worker.progress.connect(self.view.update_batch_progress)
+        worker.row_error.connect(self.view.batch_row_error)
+        self._batch_thread, self._batch_worker = thread, worker
         thread.start()
         self.view.batch_running(thread, worker)
 
-    def _on_batch_finished(self, results, thread, worker):
+    @Slot(list)
+    def _on_batch_finished(self, results):
+        thread, worker = self._batch_thread, self._batch_worker
+        self._batch_thread = self._batch_worker = None
         thread.quit()
         thread.wait()
-        self.view.batch_finished(results)
\ No newline at end of file
+        self.view.batch_finished(results, cancelled=worker.cancelled)
\ No newline at end of file
@@ -1,6 +1,7 @@
 """
 Entry point for Product Tag Generator.
 """
+import multiprocessing
 import sys
 from PySide6.QtWidgets import QApplication
 from views.main_window import MainWindow
@@ -12,4 +13,6 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    # Batch worker processes are spawned; required for frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
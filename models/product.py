@@ -3,7 +3,6 @@ Product model: dataclass-like holder for product tag data and validation.
 """
 from dataclasses import dataclass
 from typing import Tuple
-import validators
 
 QC_STATUSES = ["Approved", "Not Approved", "Prototype"]
 
@@ -23,6 +22,8 @@ class Product:
         if self.qc_status not in QC_STATUSES:
             return False, f"QC Status must be one of {QC_STATUSES}."
         if self.catalog_url.strip():
+            # validators is slow to import; only needed once a URL is entered
+            import validators
             if not validators.url(self.catalog_url.strip()):
                 return False, "Catalog / Product Information Link must be a valid URL."
         return True, ""
\ No newline at end of file
@@ -1,9 +1,15 @@
 """
 Persistent settings via QSettings (cross-platform).
-Holds default output size (inches), DPI, default export format and default output folder.
+Holds default output size (inches), DPI, default export format, default output folder,
+PNG/JPEG encoder profile, Zebra printer DPI and batch options.
 """
+import os
+
 from PySide6.QtCore import QSettings
 
+# Print head resolutions of Zebra thermal printers, in dots per inch
+PRINTER_DPIS = (203, 300, 600)
+
 class AppSettings:
     def __init__(self):
         # Organization and application names used by QSettings for platform-specific storage
@@ -36,4 +42,42 @@ class AppSettings:
         return self._settings.value("default_output_folder", "")
 
     def set_default_output_folder(self, folder: str):
-        self._settings.setValue("default_output_folder", folder)
\ No newline at end of file
+        self._settings.setValue("default_output_folder", folder)
+
+    def get_printer_dpi(self) -> int:
+        # Dot density of the Zebra printer ZPL is laid out for (PRINTER_DPIS); raster exports use get_dpi
+        value = int(self._settings.value("printer_dpi", 203))
+        return value if value in PRINTER_DPIS else 203
+
+    def set_printer_dpi(self, dpi: int):
+        self._settings.setValue("printer_dpi", int(dpi))
+
+    def get_encoder_profile(self) -> str:
+        # PNG/JPEG encoder profile (utils.exporter.ENCODER_PROFILES); unknown values fall back to lossless
+        value = self._settings.value("encoder_profile", "lossless")
+        return value if value in ("lossless", "fast", "balanced", "smallest", "monochrome") else "lossless"
+
+    def set_encoder_profile(self, name: str):
+        self._settings.setValue("encoder_profile", name)
+
+    def get_batch_archive(self):
+        # Batch files streamed into one archive (utils.batch_archive.ARCHIVE_FORMATS); None writes files
+        value = self._settings.value("batch_archive", "")
+        return value if value in ("zip", "zip-deflated", "tar") else None
+
+    def set_batch_archive(self, kind):
+        self._settings.setValue("batch_archive", kind or "")
+
+    def get_batch_single_pdf(self) -> bool:
+        # PDF batches: one multi-page PDF instead of one file per row
+        return self._settings.value("batch_single_pdf", False, type=bool)
+
+    def set_batch_single_pdf(self, enabled: bool):
+        self._settings.setValue("batch_single_pdf", bool(enabled))
+
+    def get_batch_workers(self) -> int:
+        # Worker processes for batch runs; defaults to one per CPU core
+        return max(1, int(self._settings.value("batch_workers", os.cpu_count() or 1)))
+
+    def set_batch_workers(self, workers: int):
+        self._settings.setValue("batch_workers", int(workers))
\ No newline at end of file
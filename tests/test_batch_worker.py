@@ -0,0 +1,49 @@
+"""
+BatchWorker must emit finished whatever happens in the process pool, or the window stays disabled.
+Chunk and initializer stand-ins live at module level so spawned workers can unpickle them.
+"""
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+ROWS = [{"product_name": "Pump", "part_number": f"P-{i:03d}", "qc_status": "Approved"} for i in range(40)]
+
+
+def _raising_chunk(chunk, config, trace, archive=False):
+    raise RuntimeError("render exploded")
+
+
+def _dying_chunk(chunk, config, trace, archive=False):
+    os._exit(1)
+
+
+def _failing_init(cwd, cancel):
+    raise RuntimeError("no display")
+
+
+def _run_worker(tmp_path):
+    from controllers.main_controller import BatchWorker
+    worker = BatchWorker(ROWS, str(tmp_path), "png", "Vertical", "Light", (2.0, 1.0), 50, "kii_logo.png", workers=2)
+    finished = []
+    worker.finished.connect(finished.append)
+    worker.run()
+    assert len(finished) == 1
+    return finished[0]
+
+
+@pytest.mark.parametrize("target, replacement, message", [
+    ("_run_batch_chunk", _raising_chunk, "render exploded"),
+    ("_run_batch_chunk", _dying_chunk, "terminated abruptly"),
+    # The pool's message for a failed initializer varies between Python versions
+    ("_init_batch_worker", _failing_init, ""),
+])
+def test_finished_fires_when_workers_fail(tmp_path, monkeypatch, target, replacement, message):
+    import utils.csv_batch
+    monkeypatch.setattr(utils.csv_batch, target, replacement)
+    results = _run_worker(tmp_path)
+    assert [path for path, _, _, _ in results] == [str(tmp_path / f"P-{i:03d}_Pump.png") for i in range(40)]
+    assert not any(ok for _, ok, _, _ in results)
+    assert all(msg.startswith("Batch worker failed") for _, _, msg, _ in results)
+    assert any(message in msg for _, _, msg, _ in results)
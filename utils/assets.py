@@ -0,0 +1,111 @@
+"""
+Decoded image assets (logo, QR centre image) shared by every render.
+
+Each file is decoded once; scaled variants are kept per target size in a byte-bounded LRU.
+Entries are keyed by the file's (mtime, size) signature, so swapping kii_logo.png or kiiqr.png
+on disk takes effect on the next render without restarting the app.
+Returned images are shared: treat them as read-only.
+Pillow is imported on first use of the PIL accessors.
+"""
+import os
+import threading
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QImage
+
+from utils.cache import BoundedLRUCache
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+class AssetRegistry:
+    def __init__(self, max_scaled_bytes: int = 64 * 1024 * 1024):
+        self._lock = threading.Lock()
+        # path -> (signature, decoded image); one live decode per file and kind
+        self._qimages = {}
+        self._pil_images = {}
+        self._scaled = BoundedLRUCache(max_bytes=max_scaled_bytes)
+
+    @staticmethod
+    def signature(path: str) -> Optional[Tuple[str, int, int]]:
+        """(absolute path, mtime_ns, size) of the file, or None if it does not exist."""
+        if not path:
+            return None
+        try:
+            st = os.stat(path)
+        except (OSError, ValueError):
+            return None
+        return os.path.abspath(path), st.st_mtime_ns, st.st_size
+
+    def exists(self, path: str) -> bool:
+        return self.signature(path) is not None
+
+    def _decoded(self, table: dict, path: str, sig, decode):
+        with self._lock:
+            entry = table.get(sig[0])
+            if entry is not None and entry[0] == sig:
+                return entry[1]
+        image = decode(path)
+        with self._lock:
+            table[sig[0]] = (sig, image)
+        return image
+
+    def qimage(self, path: str) -> Optional[QImage]:
+        sig = self.signature(path)
+        if sig is None:
+            return None
+        image = self._decoded(self._qimages, path, sig, QImage)
+        return None if image.isNull() else image
+
+    def scaled_qimage(self, path: str, max_w: int, max_h: int, allow_upscale: bool = True) -> Optional[QImage]:
+        """Image fitted into (max_w x max_h) keeping aspect ratio (smooth transform)."""
+        sig = self.signature(path)
+        if sig is None:
+            return None
+        key = ("qimage", sig, max_w, max_h, allow_upscale)
+        scaled = self._scaled.get(key)
+        if scaled is None:
+            source = self.qimage(path)
+            if source is None:
+                return None
+            if not allow_upscale and source.width() <= max_w and source.height() <= max_h:
+                scaled = source
+            else:
+                scaled = source.scaled(max(1, max_w), max(1, max_h), Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            self._scaled.put(key, scaled, scaled.sizeInBytes())
+        return scaled
+
+    def pil_image(self, path: str) -> Optional["Image.Image"]:
+        """Decoded RGBA PIL image."""
+        from PIL import Image
+        sig = self.signature(path)
+        if sig is None:
+            return None
+        return self._decoded(self._pil_images, path, sig, lambda p: Image.open(p).convert("RGBA"))
+
+    def pil_thumbnail(self, path: str, max_w: int, max_h: Optional[int] = None) -> Optional["Image.Image"]:
+        """RGBA PIL image fitted into (max_w x max_h, square by default) like Image.thumbnail (LANCZOS, no upscale)."""
+        sig = self.signature(path)
+        if sig is None:
+            return None
+        max_h = max_w if max_h is None else max_h
+        key = ("pil", sig, max_w, max_h)
+        thumb = self._scaled.get(key)
+        if thumb is None:
+            source = self.pil_image(path)
+            if source is None:
+                return None
+            from PIL import Image
+            thumb = source.copy()
+            thumb.thumbnail((max(1, max_w), max(1, max_h)), Image.LANCZOS)
+            self._scaled.put(key, thumb, thumb.width * thumb.height * 4)
+        return thumb
+
+    def stats(self):
+        return self._scaled.stats()
+
+
+# Shared registry used by the renderers and QR generator
+assets = AssetRegistry()
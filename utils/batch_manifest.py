@@ -0,0 +1,134 @@
+"""
+Resumable batches: a manifest of what is already rendered in an output folder.
+
+batch_manifest.jsonl in the output folder gets one JSON line per exported file:
+its name, a hash of the product fields, the render and encoder settings and the asset files (logo,
+QR centre image), and the file size. A later run over the same folder skips rows whose hash
+matches and whose output still exists with that size, so restarting an interrupted batch or
+re-running a catalog with a few edited rows only renders what is missing or changed.
+
+The file is append-only (a line is flushed after each export; the last line for a name wins),
+so a crash loses at most the rows in flight; a torn last line is ignored on load. Bump
+RENDER_REVISION when a change to the renderers alters their output, so old manifests stop matching.
+"""
+import hashlib
+import json
+import os
+from typing import Dict, Optional, Tuple
+
+from utils.exporter import _resolve_qr_logo
+
+MANIFEST_NAME = "batch_manifest.jsonl"
+RENDER_REVISION = 4
+# Rewrite the manifest on load once it holds this many superseded lines
+_COMPACT_MIN_STALE = 1000
+
+
+def _file_digest(path: str) -> Optional[str]:
+    if not path:
+        return None
+    h = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    except OSError:
+        return None
+    return h.hexdigest()
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+class BatchManifest:
+    """
+    Manifest of out_folder for one batch configuration. row_hash() digests a product dict
+    together with the configuration; is_current() tells whether the output can be reused;
+    record() appends an entry after a successful export.
+    """
+
+    def __init__(self, out_folder: str, output_format: str, layout: str, theme: str,
+                 output_inches: Tuple[float, float], dpi: int, logo_path: str = "kii_logo.png",
+                 qr_logo_path: str = "kiiqr.png", encoder: Optional[str] = None):
+        self.out_folder = out_folder
+        self.path = os.path.join(out_folder, MANIFEST_NAME)
+        settings = {
+            "revision": RENDER_REVISION,
+            "format": output_format.lower(),
+            "layout": layout,
+            "theme": theme,
+            "size": [float(v) for v in output_inches],
+            "dpi": dpi,
+            "encoder": encoder,
+            # Asset contents, not paths or mtimes: re-saving an identical logo keeps outputs current
+            "logo": _file_digest(logo_path),
+            "qr_logo": _file_digest(_resolve_qr_logo(qr_logo_path)),
+        }
+        self._settings = json.dumps(settings, sort_keys=True)
+        self._entries: Dict[str, Tuple[str, int]] = {}
+        self._file = None
+        self._load()
+
+    def _load(self):
+        lines = 0
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self._entries[entry["file"]] = (entry["hash"], entry["size"])
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                    lines += 1
+        except OSError:
+            return
+        if lines - len(self._entries) >= _COMPACT_MIN_STALE:
+            self._compact()
+
+    def _compact(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for name, (digest, size) in self._entries.items():
+                f.write(json.dumps({"file": name, "hash": digest, "size": size}) + "\n")
+        os.replace(tmp, self.path)
+
+    def row_hash(self, product: dict) -> str:
+        h = hashlib.sha256(self._settings.encode("utf-8"))
+        h.update(json.dumps(product, sort_keys=True).encode("utf-8"))
+        return h.hexdigest()
+
+    def _name(self, out_path: str) -> str:
+        return os.path.relpath(out_path, self.out_folder)
+
+    def is_current(self, out_path: str, digest: str) -> bool:
+        """True if out_path was recorded with this hash and is still on disk at its recorded size."""
+        entry = self._entries.get(self._name(out_path))
+        if entry is None or entry[0] != digest:
+            return False
+        try:
+            return os.path.getsize(out_path) == entry[1]
+        except OSError:
+            return False
+
+    def record(self, out_path: str, digest: str):
+        try:
+            size = os.path.getsize(out_path)
+        except OSError:
+            return
+        name = self._name(out_path)
+        self._entries[name] = (digest, size)
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+            if self._file.tell() and not _ends_with_newline(self.path):
+                # Terminate a line torn by a crash, so it cannot swallow the next entry
+                self._file.write("\n")
+        self._file.write(json.dumps({"file": name, "hash": digest, "size": size}) + "\n")
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -1,12 +1,50 @@
 """
 CSV batch import and processing for print runs.
-Reads a CSV, validates rows, and orchestrates export for each row.
+Reads a CSV, validates rows, and orchestrates export for each row
+(one file per row, one multi-page PDF, one ZPL label stream, or one ZIP/tar archive of the
+per-row files for the whole run).
+CsvRowStream parses rows lazily and prefetch_rows feeds them through a bounded queue,
+so large catalogs render as they are read with constant memory.
+run_batch_parallel spreads rows over worker processes, each with its own offscreen Qt context.
+Both resume by default: outputs recorded in the folder's batch manifest (utils.batch_manifest)
+with an unchanged hash are kept instead of rendered again. Both can be cancelled between rows
+through an Event (partial results are returned) and report throttled BatchProgress snapshots.
+Rows identical to one already exported in the batch are rendered once: the copies are hard
+links (or byte copies) of its file, or repeated archive members and ZPL labels (DUPLICATE_MESSAGE).
 """
 import csv
+import hashlib
+import io
+import json
 import os
+import queue
 import re
-from typing import List, Dict, Tuple
-from utils.exporter import render_tag_image, export_png_qimage, export_jpg_qimage, export_pdf
+import shutil
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import BrokenExecutor, Future, ProcessPoolExecutor, wait
+from itertools import islice
+import multiprocessing
+from typing import Callable, Iterable, Iterator, List, Dict, NamedTuple, Optional, Tuple
+from utils.exporter import render_tag_image, export_png_qimage, export_jpg_qimage, prepare_render, TagPdfWriter
+from utils.exporter import encoder_profile as resolve_encoder_profile
+from utils.pdf_vector import export_pdf_vector
+from utils.zpl import ZplWriter
+from utils.batch_manifest import BatchManifest
+from utils.batch_archive import BatchArchive, archive_path
+from utils.cache import BoundedLRUCache
+from utils.profiling import StageRecorder, stage
+
+# (output_path, success, message, stage timings in ms or None when not profiling)
+BatchResult = Tuple[str, bool, str, Optional[Dict[str, float]]]
+# Message of rows whose output the manifest shows is already up to date
+UNCHANGED_MESSAGE = "Unchanged (skipped)"
+# Message of rows identical to an earlier row of the batch, whose output was reused instead of rendered
+DUPLICATE_MESSAGE = "Duplicate (rendered once)"
+# Minimum seconds between progress callbacks, so reporting never paces the batch
+PROGRESS_INTERVAL = 0.2
 
 def sanitize_filename(name: str) -> str:
     # Remove problematic characters
@@ -14,62 +52,851 @@ def sanitize_filename(name: str) -> str:
     name = re.sub(r'\s+', "_", name).strip("_")
     return name[:200]
 
+REQUIRED_HEADERS = {"product_name", "part_number", "qc_status"}
+# Row errors kept on a CsvRowStream; the rest are only counted (and still passed to on_error)
+MAX_KEPT_ERRORS = 1000
+
+
+class CsvRowStream:
+    """
+    Validated CSV rows, parsed lazily as the stream is iterated (keys lower-cased, values stripped).
+    Only the header is read up front: check header_error before iterating. Malformed rows are
+    skipped and reported through on_error(message) as they are reached, so memory does not grow
+    with the file. fraction() and estimated_rows() track how much of the file has been parsed,
+    for progress reporting.
+    """
+
+    def __init__(self, filepath: str, on_error: Optional[Callable[[str], None]] = None):
+        self.filepath = filepath
+        self.on_error = on_error
+        self.errors: List[str] = []
+        self.error_count = 0
+        self.total_bytes = max(1, os.path.getsize(filepath))
+        self._bytes_read = 0
+        self.rows_read = 0
+        with open(filepath, newline='', encoding='utf-8-sig') as csvfile:
+            headers = [h.strip().lower() for h in csv.DictReader(csvfile).fieldnames or []]
+        missing = REQUIRED_HEADERS - set(headers)
+        self.header_error = f"CSV missing required headers: {missing}" if missing else None
+
+    def fraction(self) -> float:
+        return min(1.0, self._bytes_read / self.total_bytes)
+
+    def estimated_rows(self) -> int:
+        """Valid rows in the whole file, extrapolated from the part parsed so far (exact once done)."""
+        fraction = self.fraction()
+        return int(self.rows_read / fraction) if fraction else 0
+
+    def _report(self, message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_KEPT_ERRORS:
+            self.errors.append(message)
+        if self.on_error:
+            self.on_error(message)
+
+    def __iter__(self) -> Iterator[Dict[str,str]]:
+        if self.header_error:
+            return
+        with open(self.filepath, "rb") as raw:
+            csvfile = io.TextIOWrapper(raw, newline='', encoding='utf-8-sig')
+            reader = csv.DictReader(csvfile)
+            for i, row in enumerate(reader, start=2):
+                # Position of the buffered reader: ahead by at most one read chunk
+                self._bytes_read = raw.tell()
+                # normalize keys to lower-case
+                r = {k.strip().lower(): (v or "").strip() for k, v in row.items() if k is not None}
+                # basic validation
+                if not r.get("product_name") or not r.get("part_number"):
+                    self._report(f"Row {i}: missing product_name or part_number")
+                    continue
+                self.rows_read += 1
+                yield r
+        self._bytes_read = self.total_bytes
+
+
 def read_csv(filepath: str) -> Tuple[List[Dict[str,str]], List[str]]:
     """
     Read CSV and return list of rows as dict (keys lower-cased).
     Also return list of errors (strings) if rows are malformed.
     """
-    rows = []
-    errors = []
-    with open(filepath, newline='', encoding='utf-8-sig') as csvfile:
-        reader = csv.DictReader(csvfile)
-        headers = [h.strip().lower() for h in reader.fieldnames or []]
-        required = {"product_name", "part_number", "qc_status"}
-        if not required.issubset(set(headers)):
-            errors.append(f"CSV missing required headers: {required - set(headers)}")
-            return [], errors
-        for i, row in enumerate(reader, start=2):
-            # normalize keys to lower-case
-            r = {k.strip().lower(): (v or "").strip() for k, v in row.items()}
-            # basic validation
-            if not r.get("product_name") or not r.get("part_number"):
-                errors.append(f"Row {i}: missing product_name or part_number")
-                continue
-            rows.append(r)
-    return rows, errors
-
-def run_batch(rows: List[Dict[str,str]], out_folder: str, output_format: str, layout: str, theme: str,
-              output_inches: Tuple[float,float], dpi: int, logo_path: str = "kii_logo.png") -> List[Tuple[str, bool, str]]:
-    """
-    Run batch exports. Returns list of tuples: (output_path, success_bool, message)
+    stream = CsvRowStream(filepath)
+    if stream.header_error:
+        return [], [stream.header_error]
+    rows = list(stream)
+    return rows, stream.errors
+
+
+class _EndOfRows:
+    """Queue marker closing a prefetch_rows stream, carrying the producer's exception if any."""
+
+    def __init__(self, error: Optional[BaseException] = None):
+        self.error = error
+
+
+def prefetch_rows(rows: Iterable, maxsize: int = 256) -> Iterator:
     """
-    results = []
-    os.makedirs(out_folder, exist_ok=True)
-    for r in rows:
-        base = r.get("output_basename") or f"{r.get('part_number')}_{r.get('product_name')}"
-        base = sanitize_filename(base)
-        filename = f"{base}.{output_format.lower()}"
-        out_path = os.path.join(out_folder, filename)
+    Iterate rows through a bounded queue filled by a background thread, so parsing overlaps
+    rendering while at most maxsize rows are buffered. An exception raised by the producer is
+    re-raised in the consumer; abandoning the iterator stops the producer.
+    """
+    q = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
         try:
-            product_dict = {
-                "product_name": r.get("product_name", ""),
-                "part_number": r.get("part_number", ""),
-                "qc_status": r.get("qc_status", ""),
-                "made_in": r.get("made_in", ""),
-                "catalog_url": r.get("catalog_url", ""),
-            }
-            qimage = render_tag_image(product_dict, layout=layout, theme=theme,
-                                      output_inches=output_inches, dpi=dpi, logo_path=logo_path)
-            if output_format.lower() == "png":
-                export_png_qimage(qimage, out_path, dpi=dpi)
-            elif output_format.lower() in ("jpg","jpeg"):
-                export_jpg_qimage(qimage, out_path, dpi=dpi)
-            elif output_format.lower() == "pdf":
-                export_pdf(qimage, out_path, output_inches=output_inches, dpi=dpi)
-            else:
-                results.append((out_path, False, f"Unsupported format {output_format}"))
-                continue
-            results.append((out_path, True, "OK"))
+            for row in rows:
+                if not put(row):
+                    return
+        except BaseException as ex:
+            put(_EndOfRows(ex))
+            return
+        put(_EndOfRows())
+
+    producer = threading.Thread(target=produce, name="csv-prefetch", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = q.get()
+            if isinstance(item, _EndOfRows):
+                if item.error is not None:
+                    raise item.error
+                return
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+
+class BatchProgress(NamedTuple):
+    """Progress snapshot passed to the progress callback of run_batch / run_batch_parallel."""
+    done: int
+    failed: int
+    elapsed_s: float
+
+    @property
+    def rows_per_s(self) -> float:
+        return self.done / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+    def eta_s(self, total: int) -> Optional[float]:
+        """Seconds left until total rows are done at the average rate so far (None before the first row)."""
+        rate = self.rows_per_s
+        return max(0.0, (total - self.done) / rate) if rate else None
+
+    def describe(self, total: Optional[int] = None) -> str:
+        """One-line summary, e.g. "120 / ~1000 rows, 45.2 rows/s, ETA 0:19, 2 failed"."""
+        text = f"{self.done} / ~{total} rows" if total else f"{self.done} rows"
+        text += f", {self.rows_per_s:.1f} rows/s"
+        eta = self.eta_s(total) if total else None
+        if eta is not None:
+            text += f", ETA {int(eta) // 60}:{int(eta) % 60:02d}"
+        if self.failed:
+            text += f", {self.failed} failed"
+        return text
+
+
+class _ProgressReporter:
+    """Counts finished rows and calls back at most once per interval (and once at the end)."""
+
+    def __init__(self, callback: Optional[Callable[[BatchProgress], None]], interval: float = PROGRESS_INTERVAL):
+        self.callback = callback
+        self.interval = interval
+        self.start = time.perf_counter()
+        self.done = 0
+        self.failed = 0
+        self._reported = 0
+        self._last = float("-inf")
+
+    def add(self, results: Iterable[BatchResult]):
+        for result in results:
+            self.done += 1
+            self.failed += not result[1]
+        now = time.perf_counter()
+        if self.callback and now - self._last >= self.interval:
+            self._emit(now)
+
+    def finish(self):
+        if self.callback and self.done != self._reported:
+            self._emit(time.perf_counter())
+
+    def _emit(self, now: float):
+        self._last = now
+        self._reported = self.done
+        self.callback(BatchProgress(self.done, self.failed, now - self.start))
+
+
+class BatchSession:
+    """
+    One batch configuration, set up once and fed any number of rows:
+
+        with BatchSession(out_folder, "png", "Vertical", "Light", (4.0, 3.0), 600) as session:
+            for row in rows:
+                path, ok, message, timings = session.export(row)
+
+    Opening creates the output folder, picks the exporter for the format, opens the combined PDF
+    (single_pdf), the ZPL stream (format "zpl", named after pdf_name) or the resume manifest,
+    and warms the layout plan, decoded logos and static layer, so each row only pays for its own
+    QR, text and encoding. export_many() runs an
+    iterable (or chunk) of rows with progress and cancellation. Use a session from one thread.
+    encoder_profile names the PNG/JPEG EncoderProfile (utils.exporter.ENCODER_PROFILES).
+    archive ("zip", "zip-deflated" or "tar", see utils.batch_archive) streams the per-row PNG, JPEG
+    or PDF files into one archive named after pdf_name instead of writing them to the folder.
+    With dedupe, a row whose product fields match a row already exported is not rendered again
+    (see _RenderOnce); pages of a combined PDF are always painted, as Qt cannot reuse a page.
+    """
+
+    def __init__(self, out_folder: str, output_format: str, layout: str, theme: str,
+                 output_inches: Tuple[float,float], dpi: int, logo_path: str = "kii_logo.png",
+                 single_pdf: bool = False, pdf_name: str = "tags.pdf", resume: bool = True,
+                 profiler: Optional[StageRecorder] = None, encoder_profile: Optional[str] = None,
+                 archive: Optional[str] = None, dedupe: bool = True):
+        self.out_folder = out_folder
+        self.output_format = output_format
+        self.format = output_format.lower()
+        self.layout = layout
+        self.theme = theme
+        self.output_inches = output_inches
+        self.dpi = dpi
+        self.logo_path = logo_path
+        self.encoder = resolve_encoder_profile(encoder_profile, theme)
+        # May be swapped between rows (batch workers use one recorder per chunk)
+        self.profiler = profiler
+        self.pdf_writer: Optional[TagPdfWriter] = None
+        self.zpl_writer: Optional[ZplWriter] = None
+        self.archive: Optional[BatchArchive] = None
+        self.manifest: Optional[BatchManifest] = None
+        if archive is not None and ((single_pdf and self.format == "pdf") or self.format == "zpl"):
+            raise ValueError("An archive holds one file per row; not available for a combined PDF or ZPL stream")
+        os.makedirs(out_folder, exist_ok=True)
+        if single_pdf and self.format == "pdf":
+            self.pdf_writer = TagPdfWriter(os.path.join(out_folder, pdf_name), layout=layout, theme=theme,
+                                           output_inches=output_inches, dpi=dpi, logo_path=logo_path)
+        elif self.format == "zpl":
+            # Labels for a thermal printer: one stream, the logo graphic uploaded once at the top
+            self.zpl_writer = ZplWriter(os.path.join(out_folder, os.path.splitext(pdf_name)[0] + ".zpl"),
+                                        layout=layout, theme=theme, output_inches=output_inches, dpi=dpi,
+                                        logo_path=logo_path)
+        elif archive is not None:
+            # Rewritten as a whole on every run, so there is nothing to resume from
+            self.archive = BatchArchive(archive_path(out_folder, pdf_name, archive), archive)
+        elif resume:
+            self.manifest = BatchManifest(out_folder, output_format, layout, theme, output_inches, dpi, logo_path,
+                                          encoder=self.encoder.name if self.format != "pdf" else None)
+        self._exporter = {
+            "pdf": self._export_vector,
+            "png": self._export_png,
+            "jpg": self._export_jpg,
+            "jpeg": self._export_jpg,
+        }.get(self.format)
+        if self._exporter is not None:
+            prepare_render(layout, theme, output_inches, dpi, logo_path, raster=self.format != "pdf")
+        # Per-row files (as opposed to one combined PDF, ZPL stream or archive)
+        self._writes_files = self.pdf_writer is None and self.zpl_writer is None and self.archive is None
+        self._renders = None
+        if dedupe and self.pdf_writer is None:
+            # Repeating a ZIP member or ZPL label needs its bytes; files and tar members are linked
+            keep_data = self.zpl_writer is not None or (self.archive is not None and not self.archive.can_link)
+            self._renders = _RenderOnce(keep_data)
+
+    def export(self, r: Dict[str,str]) -> BatchResult:
+        """Export one CSV row (or reuse its unchanged or duplicate output) and return its result."""
+        out_path, product = _row_output(r, self.out_folder, self.format)
+        key = self._renders.key(product) if self._renders is not None else None
+        digest = None
+        if self.manifest is not None:
+            unchanged, digest = _check_manifest(self.manifest, out_path, product)
+            if unchanged is not None:
+                if key is not None:
+                    self._renders.wrote(out_path, key)
+                    if self._renders.source(key, self._writes_files) is not None:
+                        # Current already, but a copy of an earlier row all the same
+                        return out_path, True, DUPLICATE_MESSAGE, None
+                    self._renders.remember(key, (True, out_path, UNCHANGED_MESSAGE))
+                return unchanged
+        if self.profiler is None:
+            result = self._export_once(out_path, product, key) + (None,)
+        else:
+            with self.profiler.activate(), self.profiler.row() as timings:
+                result = self._export_once(out_path, product, key)
+            result += (timings,)
+        if digest is not None and result[1]:
+            self.manifest.record(result[0], digest)
+        return result
+
+    def export_many(self, rows: Iterable[Dict[str,str]],
+                    progress: Optional[Callable[[BatchProgress], None]] = None,
+                    cancel: Optional[threading.Event] = None) -> List[BatchResult]:
+        """
+        Export rows in order. progress gets a BatchProgress at most every PROGRESS_INTERVAL
+        seconds and once at the end; cancel (threading or multiprocessing Event) is checked
+        before each row, and once set the results so far are returned.
+        """
+        results = []
+        reporter = _ProgressReporter(progress)
+        for r in rows:
+            if cancel is not None and cancel.is_set():
+                break
+            result = self.export(r)
+            results.append(result)
+            reporter.add((result,))
+        reporter.finish()
+        return results
+
+    def _export_once(self, out_path: str, product: dict, key: Optional[bytes]) -> Tuple[str, bool, str]:
+        """Reuse the output of an identical earlier row if there is one, else export the row."""
+        if key is not None:
+            first = self._renders.source(key, self._writes_files)
+            if first is not None:
+                try:
+                    with stage("duplicate"):
+                        repeated = _repeat_output(first, self._renders.data(key), out_path, product,
+                                                  self.archive, self.zpl_writer)
+                except OSError:
+                    # The earlier file is gone or cannot be linked or copied: render after all
+                    repeated = None
+                if repeated is not None:
+                    if self._writes_files:
+                        self._renders.wrote(out_path, key)
+                    return repeated
+        result, where, data = self._export_row(out_path, product)
+        if key is not None:
+            self._renders.remember(key, (result[1], where, result[2]), data)
+            if self._writes_files:
+                self._renders.wrote(out_path, key)
+        return result
+
+    def _export_row(self, out_path: str, product_dict: dict):
+        """((path, ok, message), file path or archive member written, bytes kept for duplicates or None)."""
+        data = None
+        try:
+            if self.pdf_writer is not None:
+                page = self.pdf_writer.add_page(product_dict)
+                return (self.pdf_writer.path, True, f"OK (page {page})"), None, None
+            if self.zpl_writer is not None:
+                data = self.zpl_writer.label(product_dict)
+                label = self.zpl_writer.write_label(data)
+                return (self.zpl_writer.path, True, f"OK (label {label})"), None, data
+            if self._exporter is None:
+                return (out_path, False, f"Unsupported format {self.output_format}"), out_path, None
+            if self.archive is not None:
+                buf = io.BytesIO()
+                self._exporter(product_dict, buf)
+                data = buf.getvalue()
+                member = self.archive.add(os.path.basename(out_path), data, product_dict)
+                return (self.archive.path, True, f"OK ({member})"), member, data
+            _unshare(out_path)
+            self._exporter(product_dict, out_path)
+            return (out_path, True, "OK"), out_path, None
         except Exception as ex:
-            results.append((out_path, False, str(ex)))
-    return results
\ No newline at end of file
+            if self.archive is not None:
+                self.archive.add_failure(product_dict, str(ex))
+                return (self.archive.path, False, str(ex)), None, None
+            return (out_path, False, str(ex)), out_path, None
+
+    def _export_vector(self, product: dict, path: str):
+        # Vector PDF: drawn directly, no raster render needed
+        export_pdf_vector(product, path, layout=self.layout, theme=self.theme,
+                          output_inches=self.output_inches, dpi=self.dpi, logo_path=self.logo_path)
+
+    def _render(self, product: dict):
+        return render_tag_image(product, layout=self.layout, theme=self.theme,
+                                output_inches=self.output_inches, dpi=self.dpi, logo_path=self.logo_path)
+
+    def _export_png(self, product: dict, path: str):
+        export_png_qimage(self._render(product), path, dpi=self.dpi, profile=self.encoder)
+
+    def _export_jpg(self, product: dict, path: str):
+        export_jpg_qimage(self._render(product), path, dpi=self.dpi, profile=self.encoder)
+
+    def close(self):
+        if self.pdf_writer is not None:
+            self.pdf_writer.close()
+            self.pdf_writer = None
+        if self.zpl_writer is not None:
+            self.zpl_writer.close()
+            self.zpl_writer = None
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None
+        if self.manifest is not None:
+            self.manifest.close()
+            self.manifest = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def run_batch(rows: Iterable[Dict[str,str]], out_folder: str, output_format: str, layout: str, theme: str,
+              output_inches: Tuple[float,float], dpi: int, logo_path: str = "kii_logo.png",
+              single_pdf: bool = False, pdf_name: str = "tags.pdf",
+              progress: Optional[Callable[[BatchProgress], None]] = None,
+              profiler: Optional[StageRecorder] = None, resume: bool = True,
+              cancel: Optional[threading.Event] = None, encoder_profile: Optional[str] = None,
+              archive: Optional[str] = None, dedupe: bool = True) -> List[BatchResult]:
+    """
+    Run batch exports through one BatchSession. Returns list of tuples: (output_path, success_bool, message, timings)
+    With output_format "pdf" and single_pdf=True every row becomes a page of one PDF
+    (out_folder/pdf_name), streamed to disk page by page; output_format "zpl" always writes one
+    label stream for a thermal printer (out_folder/pdf_name with a .zpl extension).
+    progress, if given, is called with a BatchProgress at most every PROGRESS_INTERVAL seconds
+    and once when the batch ends.
+    cancel (threading or multiprocessing Event) is checked before each row; once set, the rows
+    finished so far are returned.
+    With a profiler, timings is the row's {stage: ms} dict (see utils.profiling); otherwise None.
+    With resume, rows whose output is current in the folder's manifest are not rendered again
+    (message UNCHANGED_MESSAGE) and new outputs are recorded; a combined PDF or ZPL stream is always rewritten.
+    encoder_profile selects the PNG/JPEG encoder profile (default utils.exporter.DEFAULT_ENCODER_PROFILE).
+    archive ("zip", "zip-deflated" or "tar") streams every output into out_folder/pdf_name with the
+    archive's extension (results carry the archive path and "OK (member)"); it is always rewritten.
+    With dedupe, rows identical to an earlier row are not rendered again; their message is
+    DUPLICATE_MESSAGE, so counting it gives the renders saved.
+    """
+    with BatchSession(out_folder, output_format, layout, theme, output_inches, dpi, logo_path,
+                      single_pdf=single_pdf, pdf_name=pdf_name, resume=resume, profiler=profiler,
+                      encoder_profile=encoder_profile, archive=archive, dedupe=dedupe) as session:
+        return session.export_many(rows, progress=progress, cancel=cancel)
+
+
+def _row_output(r: Dict[str,str], out_folder: str, output_format: str) -> Tuple[str, Dict[str,str]]:
+    """(output path, product dict) of a CSV row."""
+    base = r.get("output_basename") or f"{r.get('part_number')}_{r.get('product_name')}"
+    base = sanitize_filename(base)
+    filename = f"{base}.{output_format.lower()}"
+    product_dict = {
+        "product_name": r.get("product_name", ""),
+        "part_number": r.get("part_number", ""),
+        "qc_status": r.get("qc_status", ""),
+        "made_in": r.get("made_in", ""),
+        "catalog_url": r.get("catalog_url", ""),
+    }
+    return os.path.join(out_folder, filename), product_dict
+
+
+def _check_manifest(manifest: BatchManifest, out_path: str, product: dict) -> Tuple[Optional[BatchResult], str]:
+    """(result if the row's output is already current else None, the row's manifest hash)."""
+    digest = manifest.row_hash(product)
+    if manifest.is_current(out_path, digest):
+        return (out_path, True, UNCHANGED_MESSAGE, None), digest
+    return None, digest
+
+
+# Bounds of the duplicate bookkeeping: a duplicate whose original has been evicted is rendered again
+_RENDER_INDEX_BYTES = 32 * 1024 * 1024
+_RENDER_DATA_BYTES = 64 * 1024 * 1024
+
+
+class _RenderOnce:
+    """
+    What a batch has exported so far, by content. The settings are fixed for a batch, so rows
+    with equal product fields have identical outputs. first is (ok, file path or archive member,
+    message) of the row that was rendered; with keep_data its encoded bytes (ZIP member) or
+    label text (ZPL) are kept too. wrote() tracks which content each file path last received,
+    so a file overwritten by a different row of the same name is never linked from.
+    """
+
+    def __init__(self, keep_data: bool = False):
+        self.keep_data = keep_data
+        self._first = BoundedLRUCache(_RENDER_INDEX_BYTES)
+        self._written = BoundedLRUCache(_RENDER_INDEX_BYTES)
+        self._data = BoundedLRUCache(_RENDER_DATA_BYTES)
+
+    @staticmethod
+    def key(product: dict) -> bytes:
+        return hashlib.blake2b(json.dumps(product, sort_keys=True).encode("utf-8"), digest_size=16).digest()
+
+    def remember(self, key: bytes, first: Tuple[bool, Optional[str], str], data=None):
+        self._first.put(key, first, 128 + len(first[1] or "") + len(first[2]))
+        if self.keep_data and data is not None:
+            self._data.put(key, data, len(data))
+
+    def wrote(self, path: str, key: bytes):
+        self._written.put(path, key, 128 + len(path))
+
+    def written(self, path: str) -> Optional[bytes]:
+        return self._written.get(path)
+
+    def source(self, key: bytes, files: bool):
+        """first of an identical earlier row that can still be reused, or None."""
+        first = self._first.get(key)
+        if first is None:
+            return None
+        if files and first[0] and self._written.get(first[1]) != key:
+            return None
+        if self.keep_data and first[0] and self._data.get(key) is None:
+            return None
+        return first
+
+    def data(self, key: bytes):
+        return self._data.get(key) if self.keep_data else None
+
+
+def _unshare(path: str):
+    """Remove path if it is hard-linked to other outputs, so rewriting it cannot change them."""
+    try:
+        if os.stat(path).st_nlink > 1:
+            os.remove(path)
+    except OSError:
+        pass
+
+
+def _link_or_copy(src: str, dst: str):
+    """Hard-link dst to src (no second copy on disk), or copy it where links are not supported."""
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def _repeat_output(first, data, out_path: str, product: dict, archive=None,
+                   zpl_writer: Optional[ZplWriter] = None) -> Optional[Tuple[str, bool, str]]:
+    """
+    (path, ok, message) of a row identical to an earlier one, satisfied from that row's first:
+    its file linked or copied to out_path, its archive member or ZPL label repeated. None when
+    the bytes needed are no longer kept; OSError when the file cannot be linked or copied.
+    """
+    ok, where, message = first
+    path = archive.path if archive is not None else zpl_writer.path if zpl_writer is not None else out_path
+    if not ok:
+        # Identical content fails the same way; no point in trying again
+        if archive is not None:
+            archive.add_failure(product, message)
+        return path, False, message
+    if archive is not None:
+        if archive.can_link:
+            archive.add_link(os.path.basename(out_path), where, product)
+        elif data is None:
+            return None
+        else:
+            archive.add(os.path.basename(out_path), data, product)
+    elif zpl_writer is not None:
+        if data is None:
+            return None
+        zpl_writer.write_label(data)
+    elif out_path != where:
+        _link_or_copy(where, out_path)
+    return path, True, DUPLICATE_MESSAGE
+
+
+# Per-process Qt application for batch workers (kept alive for the life of the process)
+_worker_app = None
+# The batch's multiprocessing Event, set by the parent to cancel
+_worker_cancel = None
+# (session args, BatchSession) reused by every chunk the worker receives
+_worker_session = None
+
+
+class _MemberBuffer:
+    """
+    Stand-in for BatchArchive in batch workers: keeps each row's encoded file so the parent,
+    which owns the archive, can add them in row order. entries is (name, data, product) per row,
+    name and data None for a failed row.
+    """
+
+    def __init__(self):
+        self.path = ""
+        self.entries = []
+
+    def add(self, name: str, data: bytes, product: dict) -> str:
+        self.entries.append((name, data, product))
+        return name
+
+    def add_failure(self, product: dict, error: str):
+        self.entries.append((None, None, product))
+
+
+def _init_batch_worker(cwd: str, cancel):
+    """Process-pool initializer: offscreen Qt so workers can render without a display."""
+    global _worker_app, _worker_cancel
+    # Ctrl+C reaches the whole process group; the parent decides and cancels through the event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_cancel = cancel
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    os.chdir(cwd)
+    from PySide6.QtGui import QGuiApplication
+    _worker_app = QGuiApplication.instance() or QGuiApplication(["kii-batch-worker"])
+
+
+def _run_batch_chunk(chunk: List[Dict[str,str]], config: dict, trace: Optional[bool], archive: bool = False):
+    """
+    Worker side of run_batch_parallel: (results, trace events, archive entries); trace None means
+    no profiling. With archive, outputs are encoded in memory and returned as _MemberBuffer entries
+    instead of written. A cancelled chunk returns the results of the rows it finished.
+    """
+    global _worker_session
+    if _worker_session is None or _worker_session[0] != config:
+        if _worker_session is not None:
+            _worker_session[1].close()
+        # The parent plans resume and duplicates for the whole batch
+        _worker_session = (config, BatchSession(resume=False, dedupe=False, **config))
+    session = _worker_session[1]
+    session.profiler = StageRecorder(trace=trace) if trace is not None else None
+    session.archive = _MemberBuffer() if archive else None
+    results = session.export_many(chunk, cancel=_worker_cancel)
+    entries = session.archive.entries if archive else []
+    session.archive = None
+    return results, session.profiler.events if session.profiler is not None else [], entries
+
+
+def _archive_entry(target: BatchArchive, result: BatchResult, entry):
+    """Add one buffered worker file to the archive: (result with the member name, member, data)."""
+    _, ok, message, timings = result
+    name, data, product = entry
+    if data is None:
+        target.add_failure(product, message)
+        return (target.path, ok, message, timings), None, None
+    try:
+        member = target.add(name, data, product)
+    except Exception as ex:
+        target.add_failure(product, str(ex))
+        return (target.path, False, str(ex), timings), None, None
+    return (target.path, True, f"OK ({member})", timings), member, data
+
+
+def default_worker_count() -> int:
+    return max(1, os.cpu_count() or 1)
+
+
+def run_batch_parallel(rows, out_folder: str, output_format: str, layout: str, theme: str,
+                       output_inches: Tuple[float,float], dpi: int, logo_path: str = "kii_logo.png",
+                       workers: Optional[int] = None, chunk_size: int = 16,
+                       single_pdf: bool = False, pdf_name: str = "tags.pdf",
+                       progress: Optional[Callable[[BatchProgress], None]] = None,
+                       profiler: Optional[StageRecorder] = None, resume: bool = True,
+                       cancel: Optional[threading.Event] = None,
+                       encoder_profile: Optional[str] = None, archive: Optional[str] = None,
+                       dedupe: bool = True) -> List[BatchResult]:
+    """
+    Like run_batch, but rows are exported by a pool of worker processes in chunks of chunk_size.
+    Results come back in row order; progress is reported as chunks finish.
+    At most 2 * workers chunks are in flight, so rows may be any iterable without being
+    materialized up front. Falls back to run_batch with a single worker, and for a combined
+    multi-page PDF or a ZPL stream (one writer must own the file).
+    With a profiler, workers record their own stages and trace events are merged into it.
+    With resume, the manifest is checked and written here, and only changed rows reach the workers.
+    With an archive, workers encode in memory and this process adds their files in row order.
+    With dedupe, duplicates are planned here and never sent to the workers; they are linked,
+    copied or repeated in row order once their original is back.
+    Only the first row of the batch with a given output file goes to a worker; later rows of the
+    same name are written here as they are merged, so the file always ends up with the last row's
+    output, the one the manifest records.
+    Setting cancel stops the workers after their current row: chunks not yet started are dropped
+    and the rows finished so far are returned (in row order, with the unfinished ones missing).
+    A chunk that raises in its worker fails its rows; if the pool breaks (a worker dies or cannot
+    start) every row not yet rendered fails with that error, rather than the batch raising.
+    """
+    workers = workers or default_worker_count()
+    if hasattr(rows, "__len__"):
+        # No point starting processes that would never receive a chunk
+        workers = min(workers, max(1, -(-len(rows) // chunk_size)))
+    fmt = output_format.lower()
+    if workers <= 1 or (single_pdf and fmt == "pdf") or fmt == "zpl":
+        return run_batch(rows, out_folder, output_format, layout, theme, output_inches, dpi, logo_path,
+                         single_pdf=single_pdf, pdf_name=pdf_name, progress=progress, profiler=profiler,
+                         resume=resume, cancel=cancel, encoder_profile=encoder_profile, archive=archive,
+                         dedupe=dedupe)
+
+    os.makedirs(out_folder, exist_ok=True)
+    config = dict(out_folder=out_folder, output_format=output_format, layout=layout, theme=theme,
+                  output_inches=output_inches, dpi=dpi, logo_path=logo_path, encoder_profile=encoder_profile)
+    encoder = resolve_encoder_profile(encoder_profile, theme)
+    trace = profiler.trace if profiler is not None else None
+    manifest = BatchManifest(out_folder, output_format, layout, theme, output_inches, dpi, logo_path,
+                             encoder=encoder.name if fmt != "pdf" else None) if resume and archive is None else None
+    target = BatchArchive(archive_path(out_folder, pdf_name, archive), archive) if archive is not None else None
+    files = target is None
+    renders = _RenderOnce(keep_data=not files and not target.can_link) if dedupe else None
+    # Duplicates planned while their original is still in flight: pending maps its key to the
+    # original's output path, waiting counts the planned copies, and pinned keeps the original's
+    # first (and bytes) until every copy is merged, whatever the LRUs evict meanwhile
+    pending, waiting, pinned = {}, {}, {}
+    # Output files planned so far. A worker only ever writes a file no earlier row uses, so every
+    # later write to it (rows of the same name, links of copies) happens here, in row order
+    claimed = set()
+    # Session in this process for rows written at merge time, created on first use
+    local = []
+    results = []
+    reporter = _ProgressReporter(progress)
+    row_iter = iter(rows)
+
+    def plan_row(r):
+        """
+        ("done", result) of an unchanged row, or ("render" | "local" | "repeat", manifest hash,
+        key, out path, product): rendered by a worker, rendered here at merge time (a file an
+        earlier row of the batch uses) or satisfied from an identical earlier row.
+        """
+        out_path, product = _row_output(r, out_folder, output_format)
+        key = renders.key(product) if renders is not None else None
+        reused = files and out_path in claimed
+        if files:
+            claimed.add(out_path)
+        render = "local" if reused else "render"
+        digest = None
+        if manifest is not None:
+            unchanged, digest = _check_manifest(manifest, out_path, product)
+            # An earlier row of the batch writes this file first, so it is not current for this row
+            if unchanged is not None and not reused:
+                if key is not None:
+                    renders.wrote(out_path, key)
+                    if key in pending or renders.source(key, files) is not None:
+                        return "done", (out_path, True, DUPLICATE_MESSAGE, None)
+                    renders.remember(key, (True, out_path, UNCHANGED_MESSAGE))
+                return "done", unchanged
+        if key is None:
+            return render, digest, key, out_path, product
+        if key in pending:
+            repeat = not files or renders.written(pending[key]) == key
+        else:
+            first = renders.source(key, files)
+            repeat = first is not None
+            if repeat and key not in pinned:
+                pinned[key] = (first, renders.data(key))
+        if files:
+            renders.wrote(out_path, key)
+        if repeat:
+            waiting[key] = waiting.get(key, 0) + 1
+            return "repeat", digest, key, out_path, product
+        if key not in pending:
+            pending[key] = out_path
+        return render, digest, key, out_path, product
+
+    def failed_chunk(plan, error: BaseException):
+        """Worker output for a chunk that never came back: each of its rendered rows failed with error."""
+        stale = [entry for entry in plan if entry[0] == "render"]
+        message = f"Batch worker failed: {error}"
+        return ([(out_path, False, message, None) for _, _, _, out_path, _ in stale], [],
+                [(None, None, product) for _, _, _, _, product in stale])
+
+    def render_here(out_path, product):
+        if not local:
+            session = BatchSession(resume=False, dedupe=False, **config)
+            session.archive = target
+            local.append(session)
+        return local[0]._export_row(out_path, product)[0] + (None,)
+
+    # (future or None, per-row plan from plan_row)
+    in_flight = deque()
+    # spawn, not fork: forking a process that already runs Qt is unsafe, and spawn is the
+    # only start method on Windows/macOS anyway
+    ctx = multiprocessing.get_context("spawn")
+    worker_cancel = ctx.Event()
+    # Set once the pool breaks (a worker died or its initializer failed): later chunks are not
+    # submitted and their rows fail with it, so the batch still ends with a result per row
+    broken = []
+
+    def check_cancel():
+        if cancel is not None and cancel.is_set() and not worker_cancel.is_set():
+            worker_cancel.set()
+            for queued, _ in in_flight:
+                if queued is not None:
+                    queued.cancel()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_batch_worker,
+                                 initargs=(os.getcwd(), worker_cancel)) as pool:
+            while True:
+                while len(in_flight) < 2 * workers and not worker_cancel.is_set():
+                    chunk = list(islice(row_iter, chunk_size))
+                    if not chunk:
+                        break
+                    plan = [plan_row(r) for r in chunk]
+                    stale = [r for r, entry in zip(chunk, plan) if entry[0] == "render"]
+                    future = None
+                    if stale and not broken:
+                        try:
+                            future = pool.submit(_run_batch_chunk, stale, config, trace, target is not None)
+                        except BrokenExecutor as ex:
+                            broken.append(ex)
+                    if stale and broken:
+                        future = Future()
+                        future.set_exception(broken[0])
+                    in_flight.append((future, plan))
+                if not in_flight:
+                    break
+                future, plan = in_flight.popleft()
+                if future is not None:
+                    # Wake up regularly to pass a cancel request on to the workers
+                    while not wait((future,), timeout=0.1).done:
+                        check_cancel()
+                    if future.cancelled():
+                        continue
+                    try:
+                        chunk_results, events, entries = future.result()
+                    except Exception as ex:
+                        # The chunk raised in its worker, or the pool broke under it
+                        if isinstance(ex, BrokenExecutor) and not broken:
+                            broken.append(ex)
+                        chunk_results, events, entries = failed_chunk(plan, ex)
+                else:
+                    chunk_results, events, entries = [], [], []
+                merged = []
+                rendered = iter(chunk_results)
+                buffered = iter(entries)
+                for entry in plan:
+                    if entry[0] == "done":
+                        merged.append(entry[1])
+                        continue
+                    kind, digest, key, out_path, product = entry
+                    if kind != "repeat":
+                        if kind == "render":
+                            # A cancelled chunk ends early; its remaining rows were not exported
+                            result = next(rendered, None)
+                            if result is None:
+                                break
+                        elif worker_cancel.is_set():
+                            break
+                        else:
+                            result = render_here(out_path, product)
+                        where, data = out_path, None
+                        if target is not None and kind == "render":
+                            result, where, data = _archive_entry(target, result, next(buffered))
+                        if key is not None:
+                            first = (result[1], where, result[2])
+                            renders.remember(key, first, data)
+                            if pending.get(key) == out_path:
+                                del pending[key]
+                            if key in waiting:
+                                pinned[key] = (first, data)
+                    else:
+                        if key not in pinned:
+                            # Its original was cancelled before it was exported
+                            break
+                        first, data = pinned[key]
+                        waiting[key] -= 1
+                        if not waiting[key]:
+                            del waiting[key], pinned[key]
+                        try:
+                            result = _repeat_output(first, data, out_path, product, target)
+                        except OSError:
+                            result = None
+                        result = render_here(out_path, product) if result is None else result + (None,)
+                    if digest is not None and result[1]:
+                        manifest.record(result[0], digest)
+                    merged.append(result)
+                results.extend(merged)
+                reporter.add(merged)
+                if profiler is not None:
+                    profiler.events.extend(events)
+                check_cancel()
+    finally:
+        if local:
+            local[0].archive = None
+            local[0].close()
+        if manifest is not None:
+            manifest.close()
+        if target is not None:
+            target.close()
+    reporter.finish()
+    return results
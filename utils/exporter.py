@@ -5,25 +5,45 @@ Behavior:
 - QR content: Part Number + Catalog URL only.
 - Supports layout="Vertical" (stacked top logo + QR, rows below) and layout="Horizontal"
   (two-column professional layout: left = logo + label/value rows, right = large QR).
-- High-resolution defaults (dpi=600) and large QR pixel generation for crisp printing.
+- High-resolution defaults (dpi=600); QR modules are painted directly at the output resolution,
+  snapped to whole device pixels where that costs at most one module of size (see qr_grid),
+  with no intermediate bitmap or resample.
+- Preview mode (render_preview_image) paints the same layout straight at widget resolution;
+  IncrementalPreviewRenderer repaints only the rows (and QR) whose fields changed between edits.
 - QR center image uses 'kiiqr.png' if present, otherwise falls back to 'kii_logo.png'.
 - Values use monospace for consistent appearance; labels and values are aligned side-by-side.
+  Values too wide for their box are shrunk, then elided (utils.text_metrics, widths cached);
+  row labels share one size, fitted once per TagPlan.
 - Subtle frame and separators for a clean industrial look.
-- Robust QImage <-> PIL conversion using QBuffer to avoid memoryview/asstring issues.
+- QImage -> PIL conversion reads the pixel buffer directly (no PNG round-trip).
+- tag_geometry/theme_palette are shared with the vector PDF backend (utils.pdf_vector);
+  export_pdf remains available for rasterized PDFs.
+- TagPdfWriter streams batch runs into one multi-page PDF.
+- Geometry, palette, fonts and pens depend only on the configuration; they are compiled once
+  into a TagPlan (tag_plan, cached) and replayed for every product.
+- render_tag_image copies a cached static layer (background, frame, logo, labels, separators)
+  and paints only values, QC indicator and QR per product.
+- Stages are timed with utils.profiling.stage (no-op unless a StageRecorder is active).
+- Pillow and reportlab are imported on first export, so the preview path stays light at startup.
+- PNG/JPEG encoding follows an EncoderProfile (fast, balanced, smallest, monochrome; see ENCODER_PROFILES).
 """
-from typing import Tuple
-import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Tuple
 import io
+import sys
 
-from PySide6.QtGui import QImage, QPainter, QColor, QFont, QPixmap
-from PySide6.QtCore import Qt, QBuffer, QIODevice, QByteArray
-from PIL import Image
-from PIL.ImageQt import ImageQt
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import inch
-from reportlab.lib.utils import ImageReader
+from PySide6.QtGui import QImage, QPainter, QColor, QFont, QPen, QPdfWriter, QRegion, QTransform, QPageLayout, QPageSize
+from PySide6.QtCore import Qt, QRectF, QSizeF, QMarginsF
 
-from utils.qr_generator import generate_qr
+from utils.assets import assets
+from utils.cache import BoundedLRUCache
+from utils.profiling import stage
+from utils.qr_generator import generate_qr, qr_matrix
+from utils.text_metrics import fit_qt_text, fit_shared, font_key, qt_measure
+
+if TYPE_CHECKING:
+    from PIL import Image
 
 # QC colors
 QC_COLORS = {
@@ -33,6 +53,20 @@ QC_COLORS = {
 }
 
 
+def qr_data_for_product(product_data: dict) -> str:
+    """QR payload: Part Number line plus the Catalog URL (if present)."""
+    part = product_data.get("part_number", "")
+    catalog = product_data.get("catalog_url", "")
+    lines = [f"Part Number: {part}"]
+    if catalog:
+        lines.append(catalog)
+    return "\n".join(lines)
+
+
+def _resolve_qr_logo(qr_logo_path: str) -> str:
+    return qr_logo_path if assets.exists(qr_logo_path) else ("kii_logo.png" if assets.exists("kii_logo.png") else "")
+
+
 def build_qr_pil_for_product(product_data: dict, qr_pixels: int = 2400, qr_logo_path: str = "kiiqr.png"):
     """
     Build a QR PIL image containing:
@@ -40,57 +74,58 @@ def build_qr_pil_for_product(product_data: dict, qr_pixels: int = 2400, qr_logo_
       - Catalog URL (if present)
     Uses qr_logo_path for center logo if available.
     """
-    part = product_data.get("part_number", "")
-    catalog = product_data.get("catalog_url", "")
-    lines = [f"Part Number: {part}"]
-    if catalog:
-        lines.append(catalog)
-    data = "\n".join(lines)
-
-    logo_path = qr_logo_path if os.path.exists(qr_logo_path) else ("kii_logo.png" if os.path.exists("kii_logo.png") else "")
+    data = qr_data_for_product(product_data)
+    logo_path = _resolve_qr_logo(qr_logo_path)
     qr = generate_qr(data, size_pixels=qr_pixels, logo_path=logo_path, logo_scale=0.18)
     return qr
 
 
-def qimage_to_pil(qimage: QImage) -> Image.Image:
+def qimage_to_pil(qimage: QImage) -> "Image.Image":
     """
-    Convert QImage -> PIL.Image by saving PNG to QBuffer and opening with Pillow.
+    Convert QImage -> PIL.Image (RGBA) straight from the pixel buffer, without an
+    intermediate encode. ARGB32 pixels are 0xAARRGGBB words, i.e. B,G,R,A bytes on
+    little-endian machines and A,R,G,B on big-endian; rows are bytesPerLine() apart.
     """
-    ba = QByteArray()
-    buf = QBuffer(ba)
-    buf.open(QIODevice.WriteOnly)
-    qimage.save(buf, "PNG")
-    buf.close()
-    png_bytes = bytes(ba)
-    pil = Image.open(io.BytesIO(png_bytes))
-    return pil.convert("RGBA")
-
-
-def pil_to_qimage(pil_img: Image.Image) -> QImage:
+    from PIL import Image
+    with stage("qimage_to_pil"):
+        if qimage.format() not in (QImage.Format_ARGB32, QImage.Format_RGB32):
+            qimage = qimage.convertToFormat(QImage.Format_ARGB32)
+        rawmode = "BGRA" if sys.byteorder == "little" else "ARGB"
+        # The unpacker copies into Pillow-owned memory, so the result does not outlive the QImage buffer
+        pil = Image.frombuffer("RGBA", (qimage.width(), qimage.height()), qimage.constBits(),
+                               "raw", rawmode, qimage.bytesPerLine(), 1)
+        if qimage.format() == QImage.Format_RGB32:
+            # Unused alpha byte in RGB32 is 0xFF by contract, but do not trust it
+            pil.putalpha(255)
+    return pil
+
+
+def pil_to_qimage(pil_img: "Image.Image") -> QImage:
+    from PIL.ImageQt import ImageQt
     qim = ImageQt(pil_img).copy()
     return QImage(qim)
 
 
-def _draw_label_value(painter: QPainter, label: str, value: str,
-                      label_rect: Tuple[int, int, int, int],
-                      value_rect: Tuple[int, int, int, int],
-                      label_font: QFont, value_font: QFont,
-                      muted: QColor, text: QColor, qc=False):
-    """
-    Helper to draw a label (muted) and value (monospace) inside given rects.
-    If qc=True, value contains QC status and we draw a colored indicator.
-    """
+def _draw_label(painter: QPainter, label: str, label_rect: Tuple[int, int, int, int],
+                label_font: QFont, muted: QColor):
+    """Helper to draw a row label (muted), left-aligned and vertically centred in label_rect."""
     lx, ly, lw, lh = label_rect
-    vx, vy, vw, vh = value_rect
     painter.setFont(label_font)
     painter.setPen(muted)
     painter.drawText(lx, ly, lw, lh, Qt.AlignLeft | Qt.AlignVCenter, label)
 
-    painter.setFont(value_font)
+
+def _draw_value(painter: QPainter, value: str, value_rect: Tuple[int, int, int, int], row_h: int,
+                value_font: QFont, text: QColor, qc=False):
+    """
+    Helper to draw a row value (monospace) inside value_rect, shrunk or elided to fit its width.
+    If qc=True, value contains QC status and we draw a colored indicator sized from row_h.
+    """
+    vx, vy, vw, vh = value_rect
     painter.setPen(text)
     if qc:
         qc_text = value
-        indicator_r = max(6, int(lh * 0.28))
+        indicator_r = max(6, int(row_h * 0.28))
         ind_x = vx
         ind_y = vy + int((vh - indicator_r) / 2)
         painter.setPen(Qt.NoPen)
@@ -98,69 +133,185 @@ def _draw_label_value(painter: QPainter, label: str, value: str,
         painter.drawEllipse(ind_x, ind_y, indicator_r, indicator_r)
         painter.setBrush(Qt.NoBrush)
         painter.setPen(text)
-        painter.drawText(ind_x + indicator_r + 8, vy, vw - indicator_r - 12, vh, Qt.AlignLeft | Qt.AlignVCenter, qc_text)
+        text_w = vw - indicator_r - 12
+        font, qc_text = fit_qt_text(painter, value_font, qc_text, text_w)
+        painter.setFont(font)
+        painter.drawText(ind_x + indicator_r + 8, vy, text_w, vh, Qt.AlignLeft | Qt.AlignVCenter, qc_text)
     else:
+        font, value = fit_qt_text(painter, value_font, value, vw)
+        painter.setFont(font)
         painter.drawText(vx, vy, vw, vh, Qt.AlignLeft | Qt.AlignVCenter, value)
 
 
-def render_tag_image(
-    product: dict,
-    layout: str = "Vertical",
-    theme: str = "Light",
-    output_inches: Tuple[float, float] = (4.0, 3.0),
-    dpi: int = 600,
-    logo_path: str = "kii_logo.png",
-    qr_logo_path: str = "kiiqr.png",
-) -> QImage:
+def _draw_logo(painter: QPainter, logo_path: str, x: int, y: int, max_w: int, max_h: int,
+               placeholder_font_pt: float, muted: QColor, device_scale: float = 1.0):
     """
-    Render professional product tag as QImage.
+    Draw the logo scaled into (max_w x max_h) at (x, y), or a text placeholder if missing.
+    When the painter maps one layout pixel to device_scale device pixels (preview), the
+    image is scaled straight to device size so it is not resampled a second time.
+    Decoded and scaled logos come from the shared asset registry.
+    """
+    logo_img = assets.scaled_qimage(logo_path, max(1, round(max_w * device_scale)), max(1, round(max_h * device_scale)))
+    if logo_img is not None:
+        if device_scale == 1.0:
+            painter.drawImage(x, y, logo_img)
+        else:
+            painter.drawImage(QRectF(x, y, logo_img.width() / device_scale, logo_img.height() / device_scale),
+                              logo_img, QRectF(logo_img.rect()))
+        return
+    painter.setPen(muted)
+    ph_font = QFont("Sans Serif")
+    ph_font.setPointSizeF(placeholder_font_pt)
+    ph_font.setBold(False)
+    painter.setFont(ph_font)
+    painter.drawText(x, y, max_w, max_h, Qt.AlignCenter, "KII Logo")
 
-    layout: "Vertical" or "Horizontal" (case-insensitive)
+
+def qr_grid(n: int, x: float, y: float, side: float):
     """
-    layout = (layout or "Vertical").lower()
-    width_in, height_in = output_inches
-    px_w = int(width_in * dpi)
-    px_h = int(height_in * dpi)
+    Place an n x n module grid centred in the (side x side) box at (x, y), in device pixels.
+    Returns (origin_x, origin_y, size, edges) where edges[k] is the offset of module
+    boundary k from the origin.
+    Modules are a whole number of pixels (crisp on 300/600 DPI printers) when that shrinks the
+    code by at most one module; otherwise, and when the box has fewer pixels than modules, module
+    edges are rounded individually so the code fills the box without leaving it.
+    """
+    module = side / n
+    whole = int(side // n)
+    if whole >= 1 and side - whole * n <= module:
+        module = whole
+    qr_px = round(module * n)
+    ox = round(x + (side - qr_px) / 2)
+    oy = round(y + (side - qr_px) / 2)
+    return ox, oy, qr_px, [round(k * module) for k in range(n + 1)]
+
+
+def qr_dark_runs(matrix):
+    """Yield (row, start_col, end_col) for each horizontal run of dark modules."""
+    n = len(matrix)
+    for r, row in enumerate(matrix):
+        c = 0
+        while c < n:
+            if row[c]:
+                start = c
+                while c < n and row[c]:
+                    c += 1
+                yield r, start, c
+            else:
+                c += 1
 
-    img = QImage(px_w, px_h, QImage.Format_ARGB32)
 
-    # Theme palette
+def _draw_qr(painter: QPainter, data: str, x: float, y: float, side: float, qr_logo_path: str,
+             logo_scale: float = 0.18):
+    """
+    Paint the QR module matrix for `data` straight into the painter, centred in the
+    (side x side) layout box at (x, y). Works in device pixels, with modules placed by qr_grid
+    (the same rule for exports and previews). The centre logo is composited once on top.
+    """
+    with stage("qr_encode"):
+        matrix = qr_matrix(data)
+    with stage("qr_paint"):
+        _paint_qr_matrix(painter, matrix, x, y, side, qr_logo_path, logo_scale)
+
+
+def _paint_qr_matrix(painter: QPainter, matrix, x: float, y: float, side: float, qr_logo_path: str,
+                     logo_scale: float):
+    n = len(matrix)
+    dpr = painter.device().devicePixelRatioF()
+    box = painter.transform().mapRect(QRectF(x, y, side, side))
+    ox, oy, qr_px, edges = qr_grid(n, box.x() * dpr, box.y() * dpr, min(box.width(), box.height()) * dpr)
+
+    painter.save()
+    painter.resetTransform()
+    painter.scale(1 / dpr, 1 / dpr)
+    painter.setRenderHint(QPainter.Antialiasing, False)
+    painter.setPen(Qt.NoPen)
+    painter.fillRect(ox, oy, qr_px, qr_px, QColor("white"))
+    dark = QColor("black")
+    # One rect per horizontal run of dark modules
+    for r, start, end in qr_dark_runs(matrix):
+        painter.fillRect(ox + edges[start], oy + edges[r], edges[end] - edges[start], edges[r + 1] - edges[r], dark)
+
+    logo = assets.scaled_qimage(_resolve_qr_logo(qr_logo_path), int(qr_px * logo_scale), int(qr_px * logo_scale),
+                                allow_upscale=False)
+    if logo is not None:
+        lx = ox + (qr_px - logo.width()) // 2
+        ly = oy + (qr_px - logo.height()) // 2
+        # Small white rounded rectangle behind logo to improve contrast
+        pad = max(2, logo.width() // 10)
+        radius = max(2, pad // 2)
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        painter.setBrush(QColor(255, 255, 255, 235))
+        painter.drawRoundedRect(QRectF(lx - pad, ly - pad, logo.width() + 2 * pad, logo.height() + 2 * pad), radius, radius)
+        painter.drawImage(lx, ly, logo)
+    painter.restore()
+
+
+# Row labels in drawing order and the product field each one shows
+TAG_ROWS = [
+    ("Product Name", "product_name"),
+    ("Part Number", "part_number"),
+    ("QC Status", "qc_status"),
+    ("Made In", "made_in"),
+]
+
+
+@dataclass(frozen=True)
+class TagPalette:
+    bg: QColor
+    text: QColor
+    muted: QColor
+    separator: QColor
+    frame: QColor
+
+
+def theme_palette(theme: str) -> TagPalette:
     if theme and theme.lower() == "dark":
-        bg = QColor("#1A2332")
-        text = QColor("#E8EEF7")
-        muted = QColor("#DCE4F0")
-        separator = QColor(255, 255, 255, 30)
-        frame_color = QColor(255, 255, 255, 120)
-    elif theme and theme.lower() == "industrial":
-        bg = QColor("#ffffff")
-        text = QColor("#083838")
-        muted = QColor("#6b7478")
-        separator = QColor(0, 0, 0, 30)
-        frame_color = QColor(8, 56, 56, 150)
-    else:  # Light
-        bg = QColor("#ffffff")
-        text = QColor("#083838")
-        muted = QColor("#6b7478")
-        separator = QColor(0, 0, 0, 30)
-        frame_color = QColor(8, 56, 56, 150)
-
-    img.fill(bg)
-    painter = QPainter(img)
-    painter.setRenderHint(QPainter.Antialiasing)
-    painter.setRenderHint(QPainter.TextAntialiasing)
+        return TagPalette(bg=QColor("#1A2332"), text=QColor("#E8EEF7"), muted=QColor("#DCE4F0"),
+                          separator=QColor(255, 255, 255, 30), frame=QColor(255, 255, 255, 120))
+    # Light and Industrial share the print palette
+    return TagPalette(bg=QColor("#ffffff"), text=QColor("#083838"), muted=QColor("#6b7478"),
+                      separator=QColor(0, 0, 0, 30), frame=QColor(8, 56, 56, 150))
+
+
+@dataclass(frozen=True)
+class TagRow:
+    label: str
+    key: str
+    label_rect: Tuple[int, int, int, int]
+    value_rect: Tuple[int, int, int, int]
+    separator: Tuple[int, int, int]  # x1, y, x2
+
+
+@dataclass(frozen=True)
+class TagGeometry:
+    """All boxes of a tag in layout pixels (px_w x px_h at the export DPI)."""
+    px_w: int
+    px_h: int
+    frame_rect: Tuple[int, int, int, int]
+    frame_pen_width: int
+    frame_radius: int
+    label_font_pt: int
+    value_font_pt: int
+    placeholder_font_pt: int
+    logo_rect: Tuple[int, int, int, int]  # logo is fitted into this box, anchored top-left
+    qr_rect: Tuple[int, int, int]  # x, y, side
+    rows: Tuple[TagRow, ...]
+
+
+def tag_geometry(layout: str, px_w: int, px_h: int) -> TagGeometry:
+    """
+    Lay out frame, logo, QR and label/value rows for a px_w x px_h tag.
+    Shared by the raster painter and the vector backends so all outputs line up.
+    """
+    layout = (layout or "Vertical").lower()
 
-    # Draw rounded frame
+    # Rounded frame
     frame_padding = max(4, int(px_w * 0.01))
     frame_rect_x = frame_padding
     frame_rect_y = frame_padding
     frame_rect_w = px_w - 2 * frame_padding
     frame_rect_h = px_h - 2 * frame_padding
-    frame_pen = painter.pen()
-    frame_pen.setWidth(max(2, int(px_w * 0.004)))
-    frame_pen.setColor(frame_color)
-    painter.setPen(frame_pen)
-    painter.setBrush(Qt.NoBrush)
-    painter.drawRoundedRect(frame_rect_x, frame_rect_y, frame_rect_w, frame_rect_h, 12, 12)
 
     # Inner area
     pad_x = int(px_w * 0.04)
@@ -170,16 +321,8 @@ def render_tag_image(
     inner_w = frame_rect_w - 2 * pad_x
     inner_h = frame_rect_h - 2 * pad_y
 
-    # Fonts
-    label_font = QFont("Sans Serif", max(8, int(px_w * 0.028)))
-    label_font.setBold(False)
-    value_font = QFont("Monospace", max(10, int(px_w * 0.035)))
-    value_font.setStyleHint(QFont.Monospace)
-    value_font.setBold(False)
-
-    # Shared row settings
-    rows = ["Product Name", "Part Number", "QC Status", "Made In"]
-    num_rows = len(rows)
+    num_rows = len(TAG_ROWS)
+    rows = []
 
     if layout == "horizontal":
         # Horizontal layout:
@@ -200,16 +343,6 @@ def render_tag_image(
         nudge_left = max(0, int(left_w * 0.08))
         logo_x = max(left_x + 2, center_x - nudge_left)
         logo_y = left_y + int((logo_area_h - logo_max_h) / 2)
-        if os.path.exists(logo_path):
-            logo_pix = QPixmap(logo_path)
-            logo_pix = logo_pix.scaled(logo_max_w, logo_max_h, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            painter.drawPixmap(logo_x, logo_y, logo_pix)
-        else:
-            painter.setPen(muted)
-            ph_font = QFont("Sans Serif", max(10, int(px_w * 0.032)))
-            ph_font.setBold(False)
-            painter.setFont(ph_font)
-            painter.drawText(logo_x, logo_y, logo_max_w, logo_max_h, Qt.AlignCenter, "KII Logo")
 
         # Prepare rows area inside left column below logo
         rows_y = left_y + logo_area_h + int(px_h * 0.02)
@@ -221,38 +354,21 @@ def render_tag_image(
         value_col_x = left_x + label_col_w + gutter
         value_col_w = left_w - label_col_w - gutter - 6
 
-        # Draw each label/value row inside left column
-        for i, label in enumerate(rows):
+        for i, (label, key) in enumerate(TAG_ROWS):
             ry = rows_y + i * row_h
-            label_rect = (left_x + 4, ry, label_col_w - 8, row_h)
-            value_rect = (value_col_x + 2, ry, value_col_w, row_h)
-            if label == "QC Status":
-                _draw_label_value(painter, label, product.get("qc_status", ""), label_rect, value_rect, label_font, value_font, muted, text, qc=True)
-            else:
-                _draw_label_value(painter, label, product.get(label.lower().replace(" ", "_"), ""), label_rect, value_rect, label_font, value_font, muted, text, qc=False)
-            # separator
-            sep_y = ry + row_h
-            sep_pen = painter.pen()
-            sep_pen.setColor(separator)
-            sep_pen.setWidth(1)
-            painter.setPen(sep_pen)
-            painter.drawLine(left_x, sep_y, left_x + left_w, sep_y)
-            painter.setPen(text)
-
-        # Right column: draw large QR
+            rows.append(TagRow(label, key,
+                               label_rect=(left_x + 4, ry, label_col_w - 8, row_h),
+                               value_rect=(value_col_x + 2, ry, value_col_w, row_h),
+                               separator=(left_x, ry + row_h, left_x + left_w)))
+
+        # Right column: large QR, centered with slight right offset for balance
         qr_margin = int(min(right_w, inner_h) * 0.06)
         qr_area_w = right_w - 2 * qr_margin
         qr_area_h = inner_h - 2 * qr_margin
-        qr_pixels = max(2600, int(min(qr_area_w, qr_area_h) * 4))
-        qr_pil = build_qr_pil_for_product(product, qr_pixels=qr_pixels, qr_logo_path=qr_logo_path)
-        qr_qimg = ImageQt(qr_pil).copy()
-        qr_pix = QPixmap.fromImage(qr_qimg)
-        qr_pix = qr_pix.scaled(qr_area_w, qr_area_h, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        # center QR in right column with slight right offset for balance
+        qr_side = min(qr_area_w, qr_area_h)
         qr_offset = int(left_w * 0.03)
-        qx = right_x + qr_margin + int((qr_area_w - qr_pix.width()) / 2) + qr_offset
-        qy = right_y + qr_margin + int((qr_area_h - qr_pix.height()) / 2)
-        painter.drawPixmap(qx, qy, qr_pix)
+        qr_x = right_x + qr_margin + int((qr_area_w - qr_side) / 2) + qr_offset
+        qr_y = right_y + qr_margin + int((qr_area_h - qr_side) / 2)
 
     else:
         # Vertical layout (stacked top area logo + QR, followed by label/value rows in two columns)
@@ -271,29 +387,14 @@ def render_tag_image(
         nudge_left = max(0, int(left_w * 0.10))
         logo_x = max(top_x + 2, center_x - nudge_left)
         logo_y = top_y + int((top_h - logo_max_h) / 2)
-        if os.path.exists(logo_path):
-            logo_pix = QPixmap(logo_path)
-            logo_pix = logo_pix.scaled(logo_max_w, logo_max_h, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            painter.drawPixmap(logo_x, logo_y, logo_pix)
-        else:
-            painter.setPen(muted)
-            ph_font = QFont("Sans Serif", max(10, int(px_w * 0.032)))
-            ph_font.setBold(False)
-            painter.setFont(ph_font)
-            painter.drawText(logo_x, logo_y, logo_max_w, logo_max_h, Qt.AlignCenter, "KII Logo")
 
         # QR on right of top area
         qr_margin = int(min(right_w, top_h) * 0.08)
         qr_area_w = right_w - 2 * qr_margin
         qr_area_h = top_h - 2 * qr_margin
-        qr_pixels = max(2400, int(min(qr_area_w, qr_area_h) * 4))
-        qr_pil = build_qr_pil_for_product(product, qr_pixels=qr_pixels, qr_logo_path=qr_logo_path)
-        qr_qimg = ImageQt(qr_pil).copy()
-        qr_pix = QPixmap.fromImage(qr_qimg)
-        qr_pix = qr_pix.scaled(qr_area_w, qr_area_h, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        qr_x = top_x + left_w + qr_margin + int((qr_area_w - qr_pix.width()) / 2)
-        qr_y = top_y + qr_margin + int((qr_area_h - qr_pix.height()) / 2)
-        painter.drawPixmap(qr_x, qr_y, qr_pix)
+        qr_side = min(qr_area_w, qr_area_h)
+        qr_x = top_x + left_w + qr_margin + int((qr_area_w - qr_side) / 2)
+        qr_y = top_y + qr_margin + int((qr_area_h - qr_side) / 2)
 
         # Bottom rows area (two-column rows: label left, value right)
         total_row_area = inner_h - top_h - int(px_h * 0.02)
@@ -303,48 +404,568 @@ def render_tag_image(
         value_col_x = inner_x + label_col_w + gutter
         value_col_w = inner_w - label_col_w - gutter
 
-        for i, label in enumerate(rows):
+        for i, (label, key) in enumerate(TAG_ROWS):
             ry = bottom_y + i * row_h
-            label_rect = (inner_x + 4, ry, label_col_w - 8, row_h)
-            value_rect = (value_col_x + 2, ry, value_col_w - 8, row_h)
-            if label == "QC Status":
-                _draw_label_value(painter, label, product.get("qc_status", ""), label_rect, value_rect, label_font, value_font, muted, text, qc=True)
-            else:
-                key = label.lower().replace(" ", "_")
-                _draw_label_value(painter, label, product.get(key, ""), label_rect, value_rect, label_font, value_font, muted, text, qc=False)
-            # separator
-            sep_y = ry + row_h
-            sep_pen = painter.pen()
-            sep_pen.setColor(separator)
-            sep_pen.setWidth(1)
-            painter.setPen(sep_pen)
-            painter.drawLine(inner_x, sep_y, inner_x + inner_w, sep_y)
-            painter.setPen(text)
+            rows.append(TagRow(label, key,
+                               label_rect=(inner_x + 4, ry, label_col_w - 8, row_h),
+                               value_rect=(value_col_x + 2, ry, value_col_w - 8, row_h),
+                               separator=(inner_x, ry + row_h, inner_x + inner_w)))
+
+    return TagGeometry(
+        px_w=px_w,
+        px_h=px_h,
+        frame_rect=(frame_rect_x, frame_rect_y, frame_rect_w, frame_rect_h),
+        frame_pen_width=max(2, int(px_w * 0.004)),
+        frame_radius=12,
+        label_font_pt=max(8, int(px_w * 0.028)),
+        value_font_pt=max(10, int(px_w * 0.035)),
+        placeholder_font_pt=max(10, int(px_w * 0.032)),
+        logo_rect=(logo_x, logo_y, logo_max_w, logo_max_h),
+        qr_rect=(qr_x, qr_y, qr_side),
+        rows=tuple(rows),
+    )
+
+
+@dataclass(frozen=True)
+class TagPlan:
+    """
+    Compiled, product-independent part of a tag: geometry plus ready-made palette, fonts and pens.
+    labels are the row labels as drawn, all at label_font, which is shrunk (and a label elided)
+    as far as the longest label needs. Shared between renders (and threads): treat as read-only.
+    """
+    geometry: TagGeometry
+    palette: TagPalette
+    labels: Tuple[str, ...]
+    label_font: QFont
+    value_font: QFont
+    placeholder_font_pt: float
+    frame_pen: QPen
+    separator_pen: QPen
+
+
+@lru_cache(maxsize=64)
+def tag_plan(layout: str, theme: str, px_w: int, px_h: int, font_scale: float = 1.0) -> TagPlan:
+    """
+    TagPlan for a px_w x px_h tag. font_scale converts the layout's point sizes for the paint
+    device (96 / logical DPI: 1.0 for QImage, smaller for QPdfWriter at the export resolution).
+    """
+    geo = tag_geometry(layout, px_w, px_h)
+    palette = theme_palette(theme)
+    label_font = QFont("Sans Serif")
+    label_font.setPointSizeF(geo.label_font_pt * font_scale)
+    label_font.setBold(False)
+    # One size for every label, so the rows stay uniform when one of them is too long
+    label_px = geo.label_font_pt * 96.0 / 72.0
+    size, labels = fit_shared(font_key(label_font), label_px,
+                              [(row.label, row.label_rect[2]) for row in geo.rows], qt_measure(label_font))
+    if size != label_px:
+        label_font.setPointSizeF(label_font.pointSizeF() * size / label_px)
+    value_font = QFont("Monospace")
+    value_font.setPointSizeF(geo.value_font_pt * font_scale)
+    value_font.setStyleHint(QFont.Monospace)
+    value_font.setBold(False)
+    return TagPlan(
+        geometry=geo,
+        palette=palette,
+        labels=tuple(labels),
+        label_font=label_font,
+        value_font=value_font,
+        placeholder_font_pt=geo.placeholder_font_pt * font_scale,
+        frame_pen=QPen(palette.frame, geo.frame_pen_width),
+        separator_pen=QPen(palette.separator, 1),
+    )
+
+
+def _paint_tag(
+    painter: QPainter,
+    product: dict,
+    layout: str,
+    theme: str,
+    px_w: int,
+    px_h: int,
+    logo_path: str,
+    qr_logo_path: str,
+    device_scale: float = 1.0,
+):
+    """
+    Paint the tag in layout pixel coordinates (px_w x px_h at the export DPI).
+    The painter may carry a scale transform (preview); device_scale is that factor.
+    Only QImage is used here so the tag can be painted off the GUI thread.
+    """
+    # Font sizes are defined against a 96 DPI raster (QImage); devices with another
+    # logical DPI (QPdfWriter at the export resolution) get the same size in layout pixels.
+    plan = tag_plan(layout, theme, px_w, px_h, 96.0 / painter.device().logicalDpiY())
+    _paint_static(painter, plan, logo_path, device_scale)
+    _paint_variable(painter, product, plan, qr_logo_path)
+
+
+def _paint_static(painter: QPainter, plan: TagPlan, logo_path: str, device_scale: float = 1.0):
+    """Product-independent layer: background, frame, logo, row labels and separators."""
+    geo = plan.geometry
+    palette = plan.palette
+
+    painter.fillRect(0, 0, geo.px_w, geo.px_h, palette.bg)
+
+    # Draw rounded frame
+    painter.setPen(plan.frame_pen)
+    painter.setBrush(Qt.NoBrush)
+    painter.drawRoundedRect(*geo.frame_rect, geo.frame_radius, geo.frame_radius)
+
+    _draw_logo(painter, logo_path, *geo.logo_rect, plan.placeholder_font_pt, palette.muted, device_scale)
+
+    # Row labels, each row followed by a separator
+    for row, label in zip(geo.rows, plan.labels):
+        _draw_label(painter, label, row.label_rect, plan.label_font, palette.muted)
+        sep_x1, sep_y, sep_x2 = row.separator
+        painter.setPen(plan.separator_pen)
+        painter.drawLine(sep_x1, sep_y, sep_x2, sep_y)
+
+
+def _paint_variable(painter: QPainter, product: dict, plan: TagPlan, qr_logo_path: str):
+    """Per-product layer drawn over the static one: values, QC indicator and QR."""
+    geo = plan.geometry
+    with stage("paint_values"):
+        for row in geo.rows:
+            _draw_value(painter, product.get(row.key, ""), row.value_rect, row.label_rect[3],
+                        plan.value_font, plan.palette.text, qc=row.key == "qc_status")
+
+    qr_x, qr_y, qr_side = geo.qr_rect
+    _draw_qr(painter, qr_data_for_product(product), qr_x, qr_y, qr_side, qr_logo_path)
+
+
+# Static layers of recent raster configurations (a 4x3 in tag at 600 DPI is ~17 MB)
+_static_layers = BoundedLRUCache(max_bytes=128 * 1024 * 1024)
+
+
+def _static_layer(layout: str, theme: str, px_w: int, px_h: int, logo_path: str) -> QImage:
+    """Full-resolution static layer for render_tag_image, painted once per configuration and logo file."""
+    key = (layout, theme, px_w, px_h, assets.signature(logo_path) or logo_path)
+    layer = _static_layers.get(key)
+    if layer is None:
+        layer = QImage(px_w, px_h, QImage.Format_ARGB32)
+        painter = QPainter(layer)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setRenderHint(QPainter.TextAntialiasing)
+        _paint_static(painter, tag_plan(layout, theme, px_w, px_h, 96.0 / layer.logicalDpiY()), logo_path)
+        painter.end()
+        _static_layers.put(key, layer, layer.sizeInBytes())
+    return layer
 
+
+def render_tag_image(
+    product: dict,
+    layout: str = "Vertical",
+    theme: str = "Light",
+    output_inches: Tuple[float, float] = (4.0, 3.0),
+    dpi: int = 600,
+    logo_path: str = "kii_logo.png",
+    qr_logo_path: str = "kiiqr.png",
+) -> QImage:
+    """
+    Render professional product tag as QImage at full export resolution.
+
+    layout: "Vertical" or "Horizontal" (case-insensitive)
+    """
+    width_in, height_in = output_inches
+    px_w = int(width_in * dpi)
+    px_h = int(height_in * dpi)
+
+    with stage("render"):
+        # Start from a copy of the cached static layer; only the per-product parts are painted
+        with stage("static_layer"):
+            img = _static_layer(layout, theme, px_w, px_h, logo_path).copy()
+        painter = QPainter(img)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setRenderHint(QPainter.TextAntialiasing)
+        _paint_variable(painter, product, tag_plan(layout, theme, px_w, px_h, 96.0 / img.logicalDpiY()),
+                        qr_logo_path)
+        painter.end()
+    return img
+
+
+def prepare_render(
+    layout: str = "Vertical",
+    theme: str = "Light",
+    output_inches: Tuple[float, float] = (4.0, 3.0),
+    dpi: int = 600,
+    logo_path: str = "kii_logo.png",
+    qr_logo_path: str = "kiiqr.png",
+    raster: bool = True,
+):
+    """
+    Build the per-configuration caches ahead of a batch: layout plan, decoded logos and, for
+    raster output (render_tag_image), the static layer. The first row then costs no more than the rest.
+    """
+    width_in, height_in = output_inches
+    px_w = int(width_in * dpi)
+    px_h = int(height_in * dpi)
+    if raster:
+        _static_layer(layout, theme, px_w, px_h, logo_path)
+    else:
+        tag_plan(layout, theme, px_w, px_h)
+        assets.qimage(logo_path)
+    qr_logo = _resolve_qr_logo(qr_logo_path)
+    if qr_logo:
+        assets.qimage(qr_logo)
+
+
+def render_preview_image(
+    product: dict,
+    target_size: Tuple[int, int],
+    layout: str = "Vertical",
+    theme: str = "Light",
+    output_inches: Tuple[float, float] = (4.0, 3.0),
+    dpi: int = 600,
+    zoom: float = 1.0,
+    device_pixel_ratio: float = 1.0,
+    logo_path: str = "kii_logo.png",
+    qr_logo_path: str = "kiiqr.png",
+) -> QImage:
+    """
+    Render the tag for on-screen preview.
+
+    The tag is laid out exactly as for export at `dpi`, but painted straight into an image
+    that fits target_size (logical widget pixels) times zoom, so the preview looks like the
+    final output without rendering the full-resolution bitmap.
+    """
+    px_w, px_h, scale = _preview_scale(target_size, output_inches, dpi, zoom, device_pixel_ratio)
+    img = _preview_canvas(px_w, px_h, scale, device_pixel_ratio)
+    painter = _preview_painter(img, scale)
+    _paint_tag(painter, product, layout, theme, px_w, px_h, logo_path, qr_logo_path, device_scale=scale)
     painter.end()
     return img
 
 
-def export_png_qimage(qimage: QImage, path: str, dpi: int = 600):
-    pil = qimage_to_pil(qimage)
-    pil.save(path, format="PNG", dpi=(dpi, dpi))
+def _preview_scale(target_size, output_inches, dpi, zoom, device_pixel_ratio):
+    """(px_w, px_h, scale): export-DPI layout size and layout px -> device px factor of the preview."""
+    width_in, height_in = output_inches
+    px_w = int(width_in * dpi)
+    px_h = int(height_in * dpi)
+    target_w, target_h = target_size
+    return px_w, px_h, min(target_w / px_w, target_h / px_h) * zoom * device_pixel_ratio
 
 
-def export_jpg_qimage(qimage: QImage, path: str, dpi: int = 600, quality: int = 95):
-    pil = qimage_to_pil(qimage)
+def _preview_canvas(px_w: int, px_h: int, scale: float, device_pixel_ratio: float) -> QImage:
+    img = QImage(max(1, round(px_w * scale)), max(1, round(px_h * scale)), QImage.Format_ARGB32)
+    img.setDevicePixelRatio(device_pixel_ratio)
+    # The scaled tag need not end on a pixel boundary: start from transparent, not uninitialized memory
+    img.fill(Qt.transparent)
+    return img
+
+
+def _preview_painter(img: QImage, scale: float) -> QPainter:
+    painter = QPainter(img)
+    painter.setRenderHint(QPainter.Antialiasing)
+    painter.setRenderHint(QPainter.TextAntialiasing)
+    painter.setRenderHint(QPainter.SmoothPixmapTransform)
+    # Undo the image's device pixel ratio so one layout pixel maps to `scale` device pixels
+    dpr = img.devicePixelRatio()
+    painter.scale(scale / dpr, scale / dpr)
+    return painter
+
+
+# The QR payload; edits to other fields leave the code untouched
+QR_FIELDS = ("part_number", "catalog_url")
+
+
+class IncrementalPreviewRenderer:
+    """
+    Stateful render_preview_image for interactive editing.
+
+    Keeps the static layer and the last image of the current configuration. When only product
+    fields change, the value rows that changed (and the QR, only if part_number or catalog_url
+    changed) are restored from the static layer and repainted; everything else is left as is,
+    so an edit costs a row or two whatever the export DPI. Any other change (layout, theme,
+    size, DPI, zoom, logo files) triggers a full render. Use from one thread only.
+    """
+
+    def __init__(self):
+        self._config = None
+        self._plan = None
+        self._scale = 1.0
+        self._static = None
+        self._image = None
+        self._product = {}
+        self.full_renders = 0
+        self.partial_renders = 0
+
+    def render(
+        self,
+        product: dict,
+        target_size: Tuple[int, int],
+        layout: str = "Vertical",
+        theme: str = "Light",
+        output_inches: Tuple[float, float] = (4.0, 3.0),
+        dpi: int = 600,
+        zoom: float = 1.0,
+        device_pixel_ratio: float = 1.0,
+        logo_path: str = "kii_logo.png",
+        qr_logo_path: str = "kiiqr.png",
+    ) -> QImage:
+        """Same arguments and result as render_preview_image."""
+        px_w, px_h, scale = _preview_scale(target_size, output_inches, dpi, zoom, device_pixel_ratio)
+        config = (layout, theme, px_w, px_h, scale, device_pixel_ratio, qr_logo_path,
+                  assets.signature(logo_path) or logo_path, assets.signature(_resolve_qr_logo(qr_logo_path)))
+        if config != self._config:
+            self._render_full(product, config, px_w, px_h, scale, device_pixel_ratio, logo_path, qr_logo_path)
+        else:
+            self._render_changes(product, qr_logo_path)
+        self._product = dict(product)
+        return self._image
+
+    def _render_full(self, product, config, px_w, px_h, scale, dpr, logo_path, qr_logo_path):
+        static = _preview_canvas(px_w, px_h, scale, dpr)
+        painter = _preview_painter(static, scale)
+        plan = tag_plan(config[0], config[1], px_w, px_h, 96.0 / static.logicalDpiY())
+        _paint_static(painter, plan, logo_path, device_scale=scale)
+        painter.end()
+
+        image = static.copy()
+        painter = _preview_painter(image, scale)
+        _paint_variable(painter, product, plan, qr_logo_path)
+        painter.end()
+        self._config, self._plan, self._scale = config, plan, scale
+        self._static, self._image = static, image
+        self.full_renders += 1
+
+    def _render_changes(self, product, qr_logo_path):
+        changed = {k for k in set(product) | set(self._product) if product.get(k, "") != self._product.get(k, "")}
+        rows = [row for row in self._plan.geometry.rows if row.key in changed]
+        qr_changed = any(k in changed for k in QR_FIELDS)
+        if not rows and not qr_changed:
+            return
+
+        # Dirty regions in device pixels, widened to whole pixels plus antialiasing margin
+        to_device = QTransform.fromScale(self._scale, self._scale)
+        dirty = QRegion()
+        for row in rows:
+            dirty += to_device.mapRect(QRectF(*row.value_rect)).toAlignedRect().adjusted(-1, -1, 1, 1)
+        if qr_changed:
+            qr_x, qr_y, qr_side = self._plan.geometry.qr_rect
+            dirty += to_device.mapRect(QRectF(qr_x, qr_y, qr_side, qr_side)).toAlignedRect().adjusted(-1, -1, 1, 1)
+
+        # Restore the dirty regions from the static layer in device pixels (ratio 1); the image
+        # the GUI holds is detached on write
+        dpr = self._image.devicePixelRatio()
+        self._image.setDevicePixelRatio(1.0)
+        self._static.setDevicePixelRatio(1.0)
+        painter = QPainter(self._image)
+        painter.setClipRegion(dirty)
+        painter.setCompositionMode(QPainter.CompositionMode_Source)
+        painter.drawImage(0, 0, self._static)
+        painter.end()
+        self._image.setDevicePixelRatio(dpr)
+        self._static.setDevicePixelRatio(dpr)
+
+        # Repaint with the same painter setup as a full render, so the pixels match it exactly.
+        # No clip needed: values are clipped to their rects and the QR stays inside its box.
+        painter = _preview_painter(self._image, self._scale)
+        for row in rows:
+            _draw_value(painter, product.get(row.key, ""), row.value_rect, row.label_rect[3],
+                        self._plan.value_font, self._plan.palette.text, qc=row.key == "qc_status")
+        if qr_changed:
+            qr_x, qr_y, qr_side = self._plan.geometry.qr_rect
+            _draw_qr(painter, qr_data_for_product(product), qr_x, qr_y, qr_side, qr_logo_path)
+        painter.end()
+        self.partial_renders += 1
+
+
+class TagPdfWriter:
+    """
+    Multi-page PDF with one tag per page, for batch print runs.
+
+    Pages go through Qt's PDF engine, which writes each page's content stream to disk as soon
+    as the next page starts (reportlab keeps every page until save()). What stays in memory is
+    the engine's page table, about 1-2 KB per page, plus the shared QR matrix and text-fit caches,
+    which fill up to their byte limits (~80 MB together) over the first few thousand distinct rows
+    and then stay put. Tags are painted by the same code as render_tag_image, so text stays
+    vector and selectable; images are embedded once per QImage and the shared asset registry
+    hands out the same logo QImage for every page.
+
+    Unlike per-row PDFs (utils.pdf_vector, reportlab with the PDF standard fonts), pages use the
+    Qt fonts of the raster export, so a combined PDF matches the PNG/JPEG output rather than the
+    per-row PDFs.
+    """
+
+    def __init__(self, path: str, layout: str = "Vertical", theme: str = "Light",
+                 output_inches: Tuple[float, float] = (4.0, 3.0), dpi: int = 600,
+                 logo_path: str = "kii_logo.png", qr_logo_path: str = "kiiqr.png"):
+        width_in, height_in = output_inches
+        self.path = path
+        self.layout = layout
+        self.theme = theme
+        self.px_w = int(width_in * dpi)
+        self.px_h = int(height_in * dpi)
+        self.logo_path = logo_path
+        self.qr_logo_path = qr_logo_path
+        self.page_count = 0
+        self._writer = QPdfWriter(path)
+        self._writer.setCreator("KII Product Tag Generator")
+        self._writer.setResolution(dpi)
+        self._writer.setPageLayout(QPageLayout(QPageSize(QSizeF(width_in, height_in), QPageSize.Inch),
+                                               QPageLayout.Portrait, QMarginsF(0, 0, 0, 0)))
+        self._painter = None
+
+    def add_page(self, product: dict) -> int:
+        """Paint product on a new page; returns its 1-based page number."""
+        if self._painter is None:
+            self._painter = QPainter()
+            if not self._painter.begin(self._writer):
+                self._painter = None
+                raise OSError(f"Cannot write PDF: {self.path}")
+            self._painter.setRenderHint(QPainter.Antialiasing)
+            self._painter.setRenderHint(QPainter.TextAntialiasing)
+        else:
+            with stage("pdf_write"):
+                # Flushes the previous page to disk
+                self._writer.newPage()
+        with stage("pdf_page"):
+            self._painter.save()
+            _paint_tag(self._painter, product, self.layout, self.theme, self.px_w, self.px_h,
+                       self.logo_path, self.qr_logo_path)
+            self._painter.restore()
+        self.page_count += 1
+        return self.page_count
+
+    def close(self):
+        if self._painter is not None:
+            self._painter.end()
+            self._painter = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _save_encoded(pil, path, **params):
+    """
+    Encode in memory, then write in one go (so encoding and disk time can be told apart).
+    path may also be a binary file object (e.g. a BytesIO bound for a batch archive).
+    """
+    buf = io.BytesIO()
+    with stage("encode"):
+        pil.save(buf, **params)
+    with stage("write"):
+        if hasattr(path, "write"):
+            path.write(buf.getbuffer())
+            return
+        with open(path, "wb") as f:
+            f.write(buf.getbuffer())
+
+
+@dataclass(frozen=True)
+class EncoderProfile:
+    """
+    How PNG/JPEG exports are encoded. Alpha is always dropped when the image is opaque (tags are).
+    png_palette quantizes to an adaptive 256-colour palette (fast octree, no dithering; only
+    anti-aliasing shades are merged); png_1bit prints every ink (text, frame, separators, QC dot)
+    black on white (see _one_bit).
+    """
+    name: str
+    png_compress_level: int = 6
+    png_rle: bool = False
+    png_palette: bool = False
+    png_1bit: bool = False
+    jpeg_quality: int = 95
+    jpeg_optimize: bool = False
+    jpeg_grayscale: bool = False
+
+
+# Measured with benchmarks/bench_suite.py --filter encoder on a 4x3 in Light tag at 600 DPI
+# (2400x1800 px), including the QImage -> PIL conversion. The previous output (RGBA PNG at
+# Pillow's defaults) took ~250 ms for ~200 KB, JPEG q95 ~45 ms.
+#   lossless    lossless RGB, zlib level 6         ~190 ms  187 KB | JPEG q95            433 KB
+#   fast        lossless RGB, zlib RLE             ~180 ms  195 KB | JPEG q90            349 KB
+#   balanced    256-colour palette, zlib level 6   ~200 ms   77 KB | JPEG q95            433 KB
+#   smallest    256-colour palette, zlib level 9   ~390 ms   61 KB | JPEG q85 optimized  254 KB
+#   monochrome  1-bit, zlib level 6                 ~70 ms   21 KB | grayscale JPEG q90  296 KB
+ENCODER_PROFILES = {
+    "lossless": EncoderProfile("lossless"),
+    "fast": EncoderProfile("fast", png_compress_level=1, png_rle=True, jpeg_quality=90),
+    "balanced": EncoderProfile("balanced", png_palette=True),
+    "smallest": EncoderProfile("smallest", png_compress_level=9, png_palette=True, jpeg_quality=85,
+                               jpeg_optimize=True),
+    "monochrome": EncoderProfile("monochrome", png_1bit=True, jpeg_quality=90, jpeg_grayscale=True),
+}
+# Palette quantization merges anti-aliasing shades, so it is opt-in: the default stays lossless
+DEFAULT_ENCODER_PROFILE = "lossless"
+# Themes printed in one ink on white: monochrome only loses anti-aliasing and the QC dot colour
+MONOCHROME_THEMES = ("Light", "Industrial")
+# Darkest channel below which a pixel of a white-background tag is ink in 1-bit output. The faintest
+# ink of those themes is the separator line, anti-aliased over two pixel rows at ~240; a luminance
+# threshold at 128 also dropped the frame and the green and orange QC dots.
+_MONOCHROME_INK_LEVEL = 248
+
+
+def encoder_profile(name: Optional[str] = None, theme: Optional[str] = None) -> EncoderProfile:
+    """
+    Profile by name (default DEFAULT_ENCODER_PROFILE). "monochrome" falls back to "smallest"
+    for themes outside MONOCHROME_THEMES, where two tones would invert or drop colours.
+    """
+    name = (name or DEFAULT_ENCODER_PROFILE).lower()
+    if name not in ENCODER_PROFILES:
+        raise ValueError(f"Unknown encoder profile {name!r}; choose from {', '.join(ENCODER_PROFILES)}")
+    if name == "monochrome" and theme is not None and theme.capitalize() not in MONOCHROME_THEMES:
+        name = "smallest"
+    return ENCODER_PROFILES[name]
+
+
+def _opaque_rgb(pil: "Image.Image") -> "Image.Image":
+    """Drop the alpha channel when every pixel is opaque."""
+    if pil.mode == "RGBA" and pil.getchannel("A").getextrema() == (255, 255):
+        return pil.convert("RGB")
+    return pil
+
+
+def _one_bit(pil: "Image.Image") -> "Image.Image":
+    """1-bit image of a white-background tag: any pixel that departs from white in some channel is black."""
+    from PIL import ImageChops
     if pil.mode == "RGBA":
         pil = pil.convert("RGB")
-    pil.save(path, format="JPEG", dpi=(dpi, dpi), quality=quality)
+    darkest = pil.convert("L") if pil.mode != "RGB" else ImageChops.darker(
+        pil.getchannel("R"), ImageChops.darker(pil.getchannel("G"), pil.getchannel("B")))
+    return darkest.point(lambda v: 255 if v >= _MONOCHROME_INK_LEVEL else 0, mode="1")
+
+
+def export_png_qimage(qimage: QImage, path: str, dpi: int = 600, profile: Optional[EncoderProfile] = None):
+    from PIL import Image
+    profile = profile or encoder_profile()
+    pil = qimage_to_pil(qimage)
+    params = {"compress_level": profile.png_compress_level}
+    with stage("encode"):
+        pil = _opaque_rgb(pil)
+        if profile.png_1bit:
+            pil = _one_bit(pil)
+        elif profile.png_palette and pil.mode == "RGB":
+            pil = pil.quantize(256, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+        if profile.png_rle:
+            params["compress_type"] = 3  # zlib Z_RLE: suits runs of flat colour; smaller than level 1, as quick
+    _save_encoded(pil, path, format="PNG", dpi=(dpi, dpi), **params)
+
+
+def export_jpg_qimage(qimage: QImage, path: str, dpi: int = 600, quality: Optional[int] = None,
+                      profile: Optional[EncoderProfile] = None):
+    profile = profile or encoder_profile()
+    pil = qimage_to_pil(qimage)
+    with stage("encode"):
+        pil = pil.convert("L" if profile.jpeg_grayscale else "RGB")
+    _save_encoded(pil, path, format="JPEG", dpi=(dpi, dpi), quality=quality or profile.jpeg_quality,
+                  optimize=profile.jpeg_optimize)
 
 
 def export_pdf(qimage: QImage, path: str, output_inches: Tuple[float, float] = (4.0, 3.0), dpi: int = 600):
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.units import inch
+    from reportlab.lib.utils import ImageReader
     pil = qimage_to_pil(qimage)
-    buf = io.BytesIO()
-    pil.save(buf, format="PNG", dpi=(dpi, dpi))
-    buf.seek(0)
     w_in, h_in = output_inches
-    c = canvas.Canvas(path, pagesize=(w_in * inch, h_in * inch))
-    img_reader = ImageReader(buf)
-    c.drawImage(img_reader, 0, 0, width=w_in * inch, height=h_in * inch, preserveAspectRatio=True, mask="auto")
-    c.showPage()
-    c.save()
\ No newline at end of file
+    with stage("encode"):
+        c = canvas.Canvas(path, pagesize=(w_in * inch, h_in * inch))
+        # reportlab compresses the pixels itself; no need to encode a PNG first
+        img_reader = ImageReader(pil)
+        c.drawImage(img_reader, 0, 0, width=w_in * inch, height=h_in * inch, preserveAspectRatio=True, mask="auto")
+        c.showPage()
+    with stage("write"):
+        c.save()
\ No newline at end of file
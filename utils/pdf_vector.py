@@ -0,0 +1,248 @@
+"""
+Vector PDF backend.
+
+Draws the tag with reportlab primitives instead of embedding a rasterized bitmap:
+frame, separators and QC indicator are paths, labels and values are real (selectable)
+text in the PDF standard fonts, QR modules are filled rectangles and the logos are
+embedded once per document as image XObjects.
+
+Geometry comes from utils.exporter.tag_plan (cached per configuration), laid out in pixels at the requested DPI
+exactly like render_tag_image, and converted to points (1 px = 72 / dpi pt).
+"""
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+from PySide6.QtGui import QColor
+from reportlab import rl_config
+from reportlab.lib.colors import Color
+from reportlab.pdfbase.pdfmetrics import getAscentDescent, stringWidth
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from utils.assets import assets
+from utils.cache import BoundedLRUCache
+from utils.profiling import stage
+from utils.exporter import (
+    QC_COLORS, TagGeometry, TagPalette, _resolve_qr_logo, qr_data_for_product, qr_dark_runs, qr_grid, tag_plan,
+)
+from utils.qr_generator import qr_matrix
+from utils.text_metrics import fit_shared, fit_text
+
+
+LABEL_FONT = "Helvetica"
+VALUE_FONT = "Courier"
+
+# ImageReaders for logos pre-scaled to their box at the output DPI. reportlab digests the
+# reader's pixels to name the XObject, so one reader per size keeps a logo embedded once per document.
+_image_readers = BoundedLRUCache(max_bytes=64 * 1024 * 1024)
+
+# Qt sizes fonts in points against the QImage's logical DPI (96), so 1 pt = 96/72 layout px
+_QT_PX_PER_PT = 96.0 / 72.0
+
+
+@contextmanager
+def _binary_streams():
+    """
+    Write image and page streams as binary while drawing and saving: the ASCII85 armour is ~25%
+    larger and, without reportlab's optional C accelerator, encoded in pure Python — it dominated
+    PDF export time. reportlab only has the process-wide rl_config.useA85 for this, read as
+    images are drawn and as pages are saved, so it is restored afterwards for other canvases.
+    """
+    previous = rl_config.useA85
+    rl_config.useA85 = 0
+    try:
+        yield
+    finally:
+        rl_config.useA85 = previous
+
+
+def _color(c: QColor) -> Color:
+    return Color(c.redF(), c.greenF(), c.blueF(), alpha=c.alphaF())
+
+
+class _PageMapper:
+    """Converts layout pixels (top-left origin) to PDF points (bottom-left origin)."""
+
+    def __init__(self, geo: TagGeometry, dpi: int):
+        self.k = 72.0 / dpi
+        self.page_h = geo.px_h * self.k
+
+    def x(self, px: float) -> float:
+        return px * self.k
+
+    def y(self, px: float) -> float:
+        return self.page_h - px * self.k
+
+    def rect(self, x: float, y: float, w: float, h: float):
+        """(x, y, w, h) in layout px -> (x, y_bottom, w, h) in points."""
+        return x * self.k, self.page_h - (y + h) * self.k, w * self.k, h * self.k
+
+
+def _fit(src_w: int, src_h: int, box_w: float, box_h: float, allow_upscale: bool = True):
+    scale = min(box_w / src_w, box_h / src_h)
+    if not allow_upscale:
+        scale = min(scale, 1.0)
+    return round(src_w * scale), round(src_h * scale)
+
+
+def _logo_reader(path: str, w: int, h: int) -> ImageReader:
+    """ImageReader for the logo at w x h device pixels (its size in the raster export)."""
+    key = (assets.signature(path), w, h)
+    reader = _image_readers.get(key)
+    if reader is None:
+        image = assets.pil_thumbnail(path, w, h)
+        reader = ImageReader(image)
+        _image_readers.put(key, reader, image.width * image.height * 4)
+    return reader
+
+
+def _measure(font: str):
+    return lambda size, s: stringWidth(s, font, size)
+
+
+def _draw_text(c: canvas.Canvas, m: _PageMapper, text: str, font: str, font_pt: int,
+               rect: Tuple[float, float, float, float], px: Optional[float] = None):
+    """
+    Left-aligned, vertically centred text clipped to rect (layout px), like Qt.AlignLeft | Qt.AlignVCenter;
+    shrunk or elided to the rect's width as in the raster export, unless px (a size already
+    known to fit, in layout px) is given.
+    """
+    if not text:
+        return
+    x, y, w, h = rect
+    if px is None:
+        px, text = fit_text(("pdf", font), font_pt * _QT_PX_PER_PT, text, w, _measure(font))
+    size = px * m.k
+    ascent, descent = getAscentDescent(font, size)
+    line_h = ascent - descent
+    baseline = m.y(y + h / 2) - line_h / 2 - descent
+    c.saveState()
+    clip = c.beginPath()
+    clip.rect(*m.rect(x, y, w, h))
+    c.clipPath(clip, stroke=0, fill=0)
+    c.setFont(font, size)
+    c.drawString(m.x(x), baseline, text)
+    c.restoreState()
+
+
+def _draw_logo(c: canvas.Canvas, m: _PageMapper, geo: TagGeometry, palette: TagPalette, logo_path: str):
+    x, y, max_w, max_h = geo.logo_rect
+    logo = assets.qimage(logo_path)
+    if logo is None:
+        c.setFillColor(_color(palette.muted))
+        size = geo.placeholder_font_pt * _QT_PX_PER_PT * m.k
+        ascent, descent = getAscentDescent(LABEL_FONT, size)
+        c.setFont(LABEL_FONT, size)
+        c.drawCentredString(m.x(x + max_w / 2), m.y(y + max_h / 2) - (ascent + descent) / 2, "KII Logo")
+        return
+    w, h = _fit(logo.width(), logo.height(), max_w, max_h)
+    c.drawImage(_logo_reader(logo_path, w, h), *m.rect(x, y, w, h), mask="auto")
+
+
+def _draw_qr(c: canvas.Canvas, m: _PageMapper, data: str, x: int, y: int, side: int, qr_logo_path: str,
+             logo_scale: float = 0.18):
+    with stage("qr_encode"):
+        matrix = qr_matrix(data)
+    # Same whole-pixel module grid as the raster export at this DPI
+    ox, oy, qr_px, edges = qr_grid(len(matrix), x, y, side)
+    c.setFillColor(Color(1, 1, 1))
+    c.rect(*m.rect(ox, oy, qr_px, qr_px), stroke=0, fill=1)
+    path = c.beginPath()
+    for r, start, end in qr_dark_runs(matrix):
+        path.rect(*m.rect(ox + edges[start], oy + edges[r], edges[end] - edges[start], edges[r + 1] - edges[r]))
+    c.setFillColor(Color(0, 0, 0))
+    c.drawPath(path, stroke=0, fill=1)
+
+    logo_path = _resolve_qr_logo(qr_logo_path)
+    logo = assets.qimage(logo_path) if logo_path else None
+    if logo is not None:
+        logo_max = int(qr_px * logo_scale)
+        lw, lh = _fit(logo.width(), logo.height(), logo_max, logo_max, allow_upscale=False)
+        lx = ox + (qr_px - lw) // 2
+        ly = oy + (qr_px - lh) // 2
+        pad = max(2, lw // 10)
+        radius = max(2, pad // 2)
+        c.setFillColor(Color(1, 1, 1, alpha=235 / 255))
+        c.roundRect(*m.rect(lx - pad, ly - pad, lw + 2 * pad, lh + 2 * pad), radius * m.k, stroke=0, fill=1)
+        c.drawImage(_logo_reader(logo_path, lw, lh), *m.rect(lx, ly, lw, lh), mask="auto")
+
+
+def draw_tag_page(
+    c: canvas.Canvas,
+    product: dict,
+    layout: str = "Vertical",
+    theme: str = "Light",
+    output_inches: Tuple[float, float] = (4.0, 3.0),
+    dpi: int = 600,
+    logo_path: str = "kii_logo.png",
+    qr_logo_path: str = "kiiqr.png",
+):
+    """Draw one tag onto the current page of canvas c (page size must be output_inches)."""
+    width_in, height_in = output_inches
+    plan = tag_plan(layout, theme, int(width_in * dpi), int(height_in * dpi))
+    geo = plan.geometry
+    palette = plan.palette
+    m = _PageMapper(geo, dpi)
+
+    c.setFillColor(_color(palette.bg))
+    c.rect(0, 0, m.x(geo.px_w), m.page_h, stroke=0, fill=1)
+
+    # Rounded frame
+    c.setStrokeColor(_color(palette.frame))
+    c.setLineWidth(geo.frame_pen_width * m.k)
+    c.roundRect(*m.rect(*geo.frame_rect), geo.frame_radius * m.k, stroke=1, fill=0)
+
+    _draw_logo(c, m, geo, palette, logo_path)
+
+    # Labels share one size, as in the raster export (fits are cached, so this is a few lookups)
+    label_px, labels = fit_shared(("pdf", LABEL_FONT), geo.label_font_pt * _QT_PX_PER_PT,
+                                  [(row.label, row.label_rect[2]) for row in geo.rows], _measure(LABEL_FONT))
+    for row, label in zip(geo.rows, labels):
+        c.setFillColor(_color(palette.muted))
+        _draw_text(c, m, label, LABEL_FONT, geo.label_font_pt, row.label_rect, px=label_px)
+        value = product.get(row.key, "")
+        vx, vy, vw, vh = row.value_rect
+        if row.key == "qc_status":
+            # Coloured QC indicator dot followed by the status text
+            _, _, _, lh = row.label_rect
+            indicator_r = max(6, int(lh * 0.28))
+            ind_y = vy + int((vh - indicator_r) / 2)
+            c.setFillColor(_color(QC_COLORS.get(value, QColor("#083838"))))
+            ix, iy, iw, ih = m.rect(vx, ind_y, indicator_r, indicator_r)
+            c.ellipse(ix, iy, ix + iw, iy + ih, stroke=0, fill=1)
+            c.setFillColor(_color(palette.text))
+            _draw_text(c, m, value, VALUE_FONT, geo.value_font_pt,
+                       (vx + indicator_r + 8, vy, vw - indicator_r - 12, vh))
+        else:
+            c.setFillColor(_color(palette.text))
+            _draw_text(c, m, value, VALUE_FONT, geo.value_font_pt, row.value_rect)
+        # separator
+        sep_x1, sep_y, sep_x2 = row.separator
+        c.setStrokeColor(_color(palette.separator))
+        c.setLineWidth(m.k)
+        c.line(m.x(sep_x1), m.y(sep_y), m.x(sep_x2), m.y(sep_y))
+
+    qr_x, qr_y, qr_side = geo.qr_rect
+    _draw_qr(c, m, qr_data_for_product(product), qr_x, qr_y, qr_side, qr_logo_path)
+
+
+def export_pdf_vector(
+    product: dict,
+    path: str,
+    layout: str = "Vertical",
+    theme: str = "Light",
+    output_inches: Tuple[float, float] = (4.0, 3.0),
+    dpi: int = 600,
+    logo_path: str = "kii_logo.png",
+    qr_logo_path: str = "kiiqr.png",
+):
+    """Write a single-page vector PDF of the tag to path (a file name or binary file object)."""
+    w_in, h_in = output_inches
+    with _binary_streams():
+        with stage("pdf_draw"):
+            c = canvas.Canvas(path, pagesize=(w_in * 72, h_in * 72))
+            draw_tag_page(c, product, layout=layout, theme=theme, output_inches=output_inches, dpi=dpi,
+                          logo_path=logo_path, qr_logo_path=qr_logo_path)
+            c.showPage()
+        with stage("write"):
+            c.save()
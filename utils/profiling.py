@@ -0,0 +1,114 @@
+"""
+Optional per-stage timing for the render/export pipeline.
+
+Code marks its stages with `with stage("qr_encode"):`. Nothing is recorded unless a
+StageRecorder is active on the current thread (`with recorder.activate():`), so the preview
+thread and unprofiled batches only pay for one thread-local lookup per stage.
+
+While active, the recorder sums stage durations per batch row (recorder.row()) and, with
+trace=True, keeps every stage as a Chrome trace event; write_chrome_trace() saves them for
+chrome://tracing or https://ui.perfetto.dev. Stages nest (render_tag_image contains qr_paint),
+so per-row totals of nested stages overlap.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+_local = threading.local()
+
+
+class _NullStage:
+    """Shared no-op context returned by stage() when nothing is recording."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("recorder", "name", "start")
+
+    def __init__(self, recorder: "StageRecorder", name: str):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder._add(self.name, self.start, time.perf_counter_ns() - self.start)
+        return False
+
+
+def stage(name: str):
+    """Context manager timing `name` on the active recorder of this thread, if any."""
+    recorder = getattr(_local, "recorder", None)
+    if recorder is None:
+        return _NULL_STAGE
+    return _Stage(recorder, name)
+
+
+def active_recorder() -> Optional["StageRecorder"]:
+    return getattr(_local, "recorder", None)
+
+
+class StageRecorder:
+    """
+    Collects stage timings. Per-row totals (ms) are returned by row(); trace events
+    (Chrome "complete" events, microseconds) accumulate in `events` when trace=True.
+    Timestamps come from perf_counter, which is system-wide on Linux, Windows and macOS,
+    so events from batch worker processes line up with the parent's.
+    """
+
+    def __init__(self, trace: bool = False):
+        self.trace = trace
+        self.events: List[dict] = []
+        self._row: Optional[Dict[str, float]] = None
+        self._pid = os.getpid()
+
+    @contextmanager
+    def activate(self):
+        """Record stages run on the current thread for the duration of the block."""
+        previous = getattr(_local, "recorder", None)
+        _local.recorder = self
+        try:
+            yield self
+        finally:
+            _local.recorder = previous
+
+    @contextmanager
+    def row(self, label: str = "row"):
+        """Collect the stages of one batch row; yields the {stage: ms} dict (plus "total"), filled on exit."""
+        timings: Dict[str, float] = {}
+        self._row = timings
+        start = time.perf_counter_ns()
+        try:
+            yield timings
+        finally:
+            self._row = None
+            duration = time.perf_counter_ns() - start
+            self._add(label, start, duration)
+            timings["total"] = duration / 1e6
+            for name in timings:
+                timings[name] = round(timings[name], 3)
+
+    def _add(self, name: str, start_ns: int, duration_ns: int):
+        if self._row is not None:
+            self._row[name] = self._row.get(name, 0.0) + duration_ns / 1e6
+        if self.trace:
+            self.events.append({"name": name, "ph": "X", "ts": start_ns / 1e3, "dur": duration_ns / 1e3,
+                                "pid": self._pid, "tid": threading.get_ident()})
+
+    def write_chrome_trace(self, path: str):
+        """Write the recorded events as a Chrome trace-event JSON file."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
@@ -2,19 +2,79 @@
 QR generation utilities.
 Generates high-resolution QR images (PIL) with embedded logo at center,
 using high error correction (H) to ensure scannability after overlay.
+Module matrices (qr_matrix, what the preview, raster, PDF and ZPL paths paint from) are memoized
+in qr_matrix_cache and generated images in qr_image_cache, both LRU and bounded by total bytes;
+qr_cache_stats() reports their hits and misses.
+qrcode (which pulls in Pillow) is imported on first use, i.e. by the first render rather than
+at application startup.
 """
-from PIL import Image
-import qrcode
-import os
+from typing import TYPE_CHECKING, Dict, Tuple
 
-def generate_qr(data: str, size_pixels: int = 2000, logo_path: str = "kii_logo.png", logo_scale: float = 0.18) -> Image.Image:
+from utils.assets import assets
+from utils.cache import BoundedLRUCache
+from utils.profiling import stage
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# Each entry is a size_pixels^2 RGBA image (~23 MB at 2400 px), so bound by bytes, not count
+qr_image_cache = BoundedLRUCache(max_bytes=256 * 1024 * 1024)
+# Matrices range from ~10 KB (a part number) to ~280 KB (the longest URLs), so these are bounded by bytes too
+qr_matrix_cache = BoundedLRUCache(max_bytes=64 * 1024 * 1024)
+
+
+def _matrix_nbytes(matrix) -> int:
+    # One tuple per row: header plus a pointer per module (True/False are shared objects)
+    n = len(matrix)
+    return n * (56 + 8 * n)
+
+
+def qr_matrix(data: str) -> Tuple[Tuple[bool, ...], ...]:
+    """
+    Module matrix for `data` (error correction H, 4-module quiet zone included).
+    True is a dark module. Used to paint QR codes directly at the target resolution.
+    Shared through qr_matrix_cache.
+    """
+    return qr_matrix_cache.get_or_create(data, lambda: _qr_matrix_uncached(data), _matrix_nbytes)
+
+
+def qr_cache_stats() -> Dict[str, Dict[str, int]]:
+    """Hits, misses, entries and bytes of the matrix and image caches."""
+    return {"matrices": qr_matrix_cache.stats(), "images": qr_image_cache.stats()}
+
+
+def _qr_matrix_uncached(data: str) -> Tuple[Tuple[bool, ...], ...]:
+    import qrcode
+    qr = qrcode.QRCode(
+        error_correction=qrcode.constants.ERROR_CORRECT_H,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    return tuple(tuple(row) for row in qr.get_matrix())
+
+
+def generate_qr(data: str, size_pixels: int = 2000, logo_path: str = "kii_logo.png", logo_scale: float = 0.18) -> "Image.Image":
     """
     Generate a high-res QR code PIL.Image containing `data`.
     - size_pixels: final QR pixel size (square)
     - logo_path: path to logo to embed at center
     - logo_scale: fraction of QR width the logo should occupy (0.12-0.25 recommended)
-    Returns a PIL.Image (RGBA).
+    Returns a PIL.Image (RGBA). The image is shared through qr_image_cache; treat it as read-only.
     """
+    # Logo identity is (path, mtime, size) so replacing the file invalidates cached QRs
+    key = (data, size_pixels, assets.signature(logo_path), logo_scale)
+    with stage("generate_qr"):
+        return qr_image_cache.get_or_create(
+            key,
+            lambda: _generate_qr_uncached(data, size_pixels, logo_path, logo_scale),
+            lambda img: img.width * img.height * len(img.getbands()),
+        )
+
+
+def _generate_qr_uncached(data: str, size_pixels: int, logo_path: str, logo_scale: float) -> "Image.Image":
+    import qrcode
+    from PIL import Image
     # Build QR code with error correction H
     qr = qrcode.QRCode(
         error_correction=qrcode.constants.ERROR_CORRECT_H,
@@ -26,10 +86,8 @@ def generate_qr(data: str, size_pixels: int = 2000, logo_path: str = "kii_logo.p
     qr_img = qr.make_image(fill_color="black", back_color="white").convert("RGBA")
     qr_img = qr_img.resize((size_pixels, size_pixels), resample=Image.NEAREST)
 
-    if os.path.exists(logo_path):
-        logo = Image.open(logo_path).convert("RGBA")
-        logo_max_size = int(size_pixels * logo_scale)
-        logo.thumbnail((logo_max_size, logo_max_size), Image.LANCZOS)
+    logo = assets.pil_thumbnail(logo_path, int(size_pixels * logo_scale))
+    if logo is not None:
 
         lx = (size_pixels - logo.width) // 2
         ly = (size_pixels - logo.height) // 2
@@ -0,0 +1,126 @@
+"""
+Cached text measurement and auto-fit for single-line label and value text.
+
+Values are drawn into fixed rectangles; a long product name used to be clipped mid-word.
+fit_text shrinks such text (down to MIN_FIT_SCALE of its size) and, if it still does not
+fit, elides it with "…". Widths are cached per (font, pixel size, string) and whole fit
+results per (font, pixel size, string, box width), so a batch whose rows share vocabulary
+(QC statuses, countries of origin, labels) measures each string once and then only does
+dictionary lookups. Sizes are in layout pixels, so the raster, preview and PDF painters
+share the cache whatever the device resolution.
+"""
+import sys
+from typing import Callable, Hashable, Iterable, List, Tuple
+
+from PySide6.QtGui import QFont, QFontMetricsF, QImage, QPainter
+
+from utils.cache import BoundedLRUCache
+
+# Smallest size text is shrunk to before it is elided instead
+MIN_FIT_SCALE = 0.7
+ELLIPSIS = "…"
+
+# Keys hold the measured string, so entries are sized by it; a few MB covers any realistic vocabulary
+_widths = BoundedLRUCache(max_bytes=8 * 1024 * 1024)
+_fits = BoundedLRUCache(max_bytes=8 * 1024 * 1024)
+
+
+def _entry_bytes(text: str) -> int:
+    return sys.getsizeof(text) + 96
+
+
+def font_key(font: QFont) -> Tuple:
+    """Size-independent identity of a QFont for cache keys."""
+    return ("qt", font.family(), font.styleHint(), font.weight(), font.italic(), font.stretch())
+
+
+def text_width(key: Hashable, px: float, text: str, measure: Callable[[float, str], float]) -> float:
+    """Width of text at pixel size px, measured once with measure(px, text) and then cached."""
+    cache_key = (key, round(px, 2), text)
+    width = _widths.get(cache_key)
+    if width is None:
+        width = measure(px, text)
+        _widths.put(cache_key, width, _entry_bytes(text))
+    return width
+
+
+def _elide(key: Hashable, px: float, text: str, max_w: float, measure, ellipsis: str) -> str:
+    """Longest prefix of text that fits max_w with an ellipsis appended (binary search)."""
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if text_width(key, px, text[:mid].rstrip() + ellipsis, measure) <= max_w:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo].rstrip() + ellipsis if lo else ellipsis
+
+
+def fit_text(key: Hashable, px: float, text: str, max_w: float,
+             measure: Callable[[float, str], float], ellipsis: str = ELLIPSIS) -> Tuple[float, str]:
+    """
+    (pixel size, text) to draw text in a box max_w wide: px and text unchanged when it fits,
+    a smaller size when shrinking to no less than MIN_FIT_SCALE is enough, else the smallest
+    size with the text elided. measure(px, text) returns the width for the font behind key.
+    """
+    cache_key = (key, round(px, 2), text, round(max_w, 2), ellipsis)
+    fitted = _fits.get(cache_key)
+    if fitted is not None:
+        return fitted
+    width = text_width(key, px, text, measure)
+    if not text or width <= max_w:
+        fitted = (px, text)
+    else:
+        min_px = px * MIN_FIT_SCALE
+        size = max(min_px, px * max_w / width)
+        # Widths are not exactly proportional to size (hinting); step down until it fits
+        while size > min_px and text_width(key, size, text, measure) > max_w:
+            size = max(min_px, size * 0.97)
+        if text_width(key, size, text, measure) <= max_w:
+            fitted = (size, text)
+        else:
+            fitted = (min_px, _elide(key, min_px, text, max_w, measure, ellipsis))
+    _fits.put(cache_key, fitted, _entry_bytes(text) + _entry_bytes(fitted[1]))
+    return fitted
+
+
+def fit_shared(key: Hashable, px: float, items: Iterable[Tuple[str, float]],
+               measure: Callable[[float, str], float], ellipsis: str = ELLIPSIS) -> Tuple[float, List[str]]:
+    """
+    One pixel size for a set of (text, box width) items, such as the row labels of a tag: the
+    largest size at which each text fits, and the texts (elided where even MIN_FIT_SCALE is too big).
+    """
+    fits = [fit_text(key, px, text, max_w, measure, ellipsis) for text, max_w in items]
+    # A text only comes back elided at the smallest size, which is then the shared one
+    return min((size for size, _ in fits), default=px), [text for _, text in fits]
+
+
+# 96 DPI reference device for Qt measurements (the DPI layout pixels are defined against)
+_reference_device = None
+
+
+def qt_measure(font: QFont) -> Callable[[float, str], float]:
+    """measure(px, text) for fit_text: advance width of text in font's family and style at px layout pixels."""
+    def measure(px: float, text: str) -> float:
+        global _reference_device
+        if _reference_device is None:
+            _reference_device = QImage(1, 1, QImage.Format_ARGB32)
+        sized = QFont(font)
+        sized.setPointSizeF(px * 72.0 / _reference_device.logicalDpiY())
+        return QFontMetricsF(sized, _reference_device).horizontalAdvance(text)
+    return measure
+
+
+def fit_qt_text(painter: QPainter, font: QFont, text: str, max_w: float) -> Tuple[QFont, str]:
+    """
+    (font, text) to draw text with painter in a box max_w layout pixels wide; font is returned
+    as is unless the text has to shrink.
+    """
+    px = font.pointSizeF() * painter.device().logicalDpiY() / 72.0
+    size, shown = fit_text(font_key(font), px, text, max_w, qt_measure(font))
+    if size == px:
+        return font, shown
+    fitted = QFont(font)
+    fitted.setPointSizeF(font.pointSizeF() * size / px)
+    return fitted, shown
+
@@ -0,0 +1,261 @@
+"""
+ZPL backend for Zebra thermal printers.
+
+Lays out the same Vertical/Horizontal templates as the raster and PDF exports (utils.exporter.tag_plan)
+with printer-native commands: ^GB boxes and lines for the frame and separators, ^A0 scalable text
+for labels and values (fitted on the host, see _text), ^GC for the QC indicator and the printer's
+own ^BQ QR symbol. The logo is
+converted to 1-bit and uploaded once per stream as a stored graphic (~DG, ASCII-compressed), then
+recalled by every label with ^XG. A label is a few hundred bytes of plain text, so a whole batch is
+one small .zpl stream that can be inspected locally or sent straight to the printer (port 9100).
+
+Layout pixels are printer dots: pass the printer's resolution as dpi (203, 300 or 600).
+Thermal labels are black on white, so the theme only affects the on-screen preview; the QR centre
+logo is left out to keep the printer-generated symbol clean.
+"""
+from itertools import groupby
+from typing import List, Optional, Tuple
+
+from utils.assets import assets
+from utils.exporter import qr_data_for_product, tag_plan
+from utils.profiling import stage
+from utils.qr_generator import qr_matrix
+from utils.text_metrics import fit_shared, fit_text
+
+# Stored graphic name on the printer's RAM drive
+LOGO_GRAPHIC = "R:KIILOGO.GRF"
+
+# Qt sizes fonts in points against the QImage's logical DPI (96), so 1 pt = 96/72 layout px
+_QT_PX_PER_PT = 96.0 / 72.0
+
+# Advance widths of the printer's ^A0 font (CG Triumvirate Bold Condensed) as fractions of the
+# character height, rounded up: the real metrics live on the printer, and an estimate that comes
+# out short would let a field overflow its box
+_A0_NARROW = set(" !'(),-./:;I[]fijlrt|")
+_A0_WIDE = set("%@MWmw")
+_A0_FONT_KEY = ("zpl", "A0")
+
+
+def _a0_width(size: float, text: str) -> float:
+    """Estimated width in dots of text in ^A0 at character height size."""
+    units = 0.0
+    for ch in text:
+        if ch in _A0_NARROW:
+            units += 0.32
+        elif ch in _A0_WIDE:
+            units += 0.85
+        elif ch.islower():
+            units += 0.52
+        else:
+            units += 0.62
+    return units * size
+
+
+def _field(text: str) -> str:
+    """^FD payload with ^FH hex escapes (_XX) for characters ZPL would treat as commands or drop."""
+    out = []
+    for ch in text:
+        if ch in "^~_" or ord(ch) < 32:
+            out.append(f"_{ord(ch):02X}")
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def _fit_size(font_pt: float, text: str, w: int) -> Tuple[int, str]:
+    """(^A0 height, text) for text in a box w dots wide, shrunk or elided like the raster text."""
+    size, text = fit_text(_A0_FONT_KEY, max(1, round(font_pt * _QT_PX_PER_PT)), text, w, _a0_width,
+                          ellipsis="...")
+    return max(1, int(size)), text
+
+
+def _text(x: int, y: int, w: int, h: int, font_pt: float, text: str, align: str = "L",
+          size: Optional[int] = None) -> str:
+    """
+    Single-line text vertically centred in (x, y, w, h); align is L, C or R. The text is fitted
+    to the box width here (shrunk, then elided), as the printer would wrap an overlong ^FB line
+    and overprint it; size forces an ^A0 height that is already known to fit.
+    """
+    if not text:
+        return ""
+    if size is None:
+        size, text = _fit_size(font_pt, text, w)
+    top = y + max(0, (h - size) // 2)
+    return f"^FO{x},{top}^A0N,{size}^FB{max(1, w)},1,0,{align},0^FH^FD{_field(text)}^FS\n"
+
+
+def _repeat_code(n: int) -> str:
+    """ZPL ASCII-compression repeat count: G..Y are 1..19, g..z are 20..400 in steps of 20."""
+    code = ""
+    while n > 400:
+        code += "z"
+        n -= 400
+    if n >= 20:
+        code += chr(ord("f") + n // 20)
+        n %= 20
+    if n:
+        code += chr(ord("F") + n)
+    return code
+
+
+def _compress_rows(rows: List[str]) -> str:
+    """Zebra ASCII compression of hex rows: runs, ',' (rest of row blank) and ':' (same as previous row)."""
+    out = []
+    previous = None
+    for row in rows:
+        if row == previous:
+            out.append(":")
+            continue
+        previous = row
+        stripped = row.rstrip("0")
+        if not stripped:
+            out.append(",")
+            continue
+        for ch, run in groupby(stripped):
+            n = len(list(run))
+            out.append((_repeat_code(n) if n > 1 else "") + ch)
+        if len(stripped) < len(row):
+            out.append(",")
+    return "".join(out)
+
+
+def _fit(src_w: int, src_h: int, box_w: int, box_h: int) -> Tuple[int, int]:
+    scale = min(box_w / src_w, box_h / src_h)
+    return max(1, round(src_w * scale)), max(1, round(src_h * scale))
+
+
+def logo_graphic(logo_path: str, box_w: int, box_h: int) -> Optional[Tuple[str, int, int]]:
+    """
+    (~DG upload command, width, height) of the logo fitted into box_w x box_h dots as a
+    1-bit image, or None if the logo file is missing.
+    """
+    from PIL import Image, ImageOps
+    logo = assets.qimage(logo_path)
+    if logo is None:
+        return None
+    w, h = _fit(logo.width(), logo.height(), box_w, box_h)
+    image = assets.pil_image(logo_path).resize((w, h), Image.LANCZOS)
+    flat = Image.new("RGB", image.size, "white")
+    flat.paste(image, mask=image.getchannel("A"))
+    # Thresholded rather than dithered: solid runs print crisply and compress to a few codes.
+    # Inverted so a set bit is a printed (black) dot; row padding bits stay unprinted
+    bits = ImageOps.invert(flat.convert("L")).convert("1", dither=Image.Dither.NONE)
+    row_bytes = (bits.width + 7) // 8
+    data = bits.tobytes()
+    rows = [data[i:i + row_bytes].hex().upper() for i in range(0, len(data), row_bytes)]
+    command = f"~DG{LOGO_GRAPHIC},{len(data)},{row_bytes},{_compress_rows(rows)}\n"
+    return command, bits.width, bits.height
+
+
+class ZplWriter:
+    """
+    One .zpl stream with a label per product, for batch print runs. The logo graphic is uploaded
+    at the top of the stream and freed again by close(); the product-independent fields of a
+    label (frame, logo, row labels, separators) are built once and reused for every label.
+    """
+
+    def __init__(self, path: str, layout: str = "Vertical", theme: str = "Light",
+                 output_inches: Tuple[float, float] = (4.0, 3.0), dpi: int = 203,
+                 logo_path: str = "kii_logo.png"):
+        width_in, height_in = output_inches
+        self.path = path
+        self.label_count = 0
+        self.plan = tag_plan(layout, theme, int(width_in * dpi), int(height_in * dpi))
+        geo = self.plan.geometry
+        logo = logo_graphic(logo_path, *geo.logo_rect[2:])
+        self._file = open(path, "w", encoding="utf-8", newline="\n")
+        self._has_graphic = logo is not None
+        if logo is not None:
+            self._file.write(logo[0])
+        self._static = self._static_fields(logo)
+
+    def _static_fields(self, logo) -> str:
+        geo = self.plan.geometry
+        fx, fy, fw, fh = geo.frame_rect
+        rounding = min(8, round(geo.frame_radius * 16 / max(1, min(fw, fh))))
+        out = [
+            "^XA\n^CI28\n",
+            f"^PW{geo.px_w}\n^LL{geo.px_h}\n^LH0,0\n",
+            f"^FO{fx},{fy}^GB{fw},{fh},{geo.frame_pen_width},B,{rounding}^FS\n",
+        ]
+        x, y, max_w, max_h = geo.logo_rect
+        if logo is not None:
+            out.append(f"^FO{x},{y}^XG{LOGO_GRAPHIC},1,1^FS\n")
+        else:
+            out.append(_text(x, y, max_w, max_h, geo.placeholder_font_pt, "KII Logo", align="C"))
+        # Labels share one size, the largest that fits every one of them
+        label_size, labels = fit_shared(_A0_FONT_KEY, max(1, round(geo.label_font_pt * _QT_PX_PER_PT)),
+                                        [(row.label, row.label_rect[2]) for row in geo.rows], _a0_width,
+                                        ellipsis="...")
+        for row, label in zip(geo.rows, labels):
+            out.append(_text(*row.label_rect, geo.label_font_pt, label, size=max(1, int(label_size))))
+            sep_x1, sep_y, sep_x2 = row.separator
+            out.append(f"^FO{sep_x1},{sep_y}^GB{max(1, sep_x2 - sep_x1)},1,1^FS\n")
+        return "".join(out)
+
+    def label(self, product: dict) -> str:
+        """ZPL of one label (^XA...^XZ) for product."""
+        geo = self.plan.geometry
+        out = [self._static]
+        for row in geo.rows:
+            value = product.get(row.key, "")
+            vx, vy, vw, vh = row.value_rect
+            if row.key == "qc_status":
+                # Filled circle followed by the status text, as in the raster layout
+                d = max(6, int(row.label_rect[3] * 0.28))
+                out.append(f"^FO{vx},{vy + (vh - d) // 2}^GC{d},{d},B^FS\n")
+                out.append(_text(vx + d + 8, vy, vw - d - 12, vh, geo.value_font_pt, value))
+            else:
+                out.append(_text(vx, vy, vw, vh, geo.value_font_pt, value))
+        qr_x, qr_y, side = geo.qr_rect
+        data = qr_data_for_product(product)
+        with stage("qr_encode"):
+            # The printer encodes the symbol; the local matrix only sizes it (same data, level H)
+            modules = len(qr_matrix(data))
+        magnification = max(1, min(10, side // modules))
+        offset = (side - (modules - 8) * magnification) // 2
+        out.append(f"^FO{qr_x + offset},{qr_y + offset}^BQN,2,{magnification}^FH^FDHA,{_field(data)}^FS\n")
+        out.append("^XZ\n")
+        return "".join(out)
+
+    def add_label(self, product: dict) -> int:
+        """Append a label for product; returns its 1-based number."""
+        return self.write_label(self.label(product))
+
+    def write_label(self, text: str) -> int:
+        """Append label text from label() (e.g. again, for an identical product); returns its number."""
+        with stage("write"):
+            self._file.write(text)
+        self.label_count += 1
+        return self.label_count
+
+    def close(self):
+        if self._file is None:
+            return
+        if self._has_graphic:
+            # Free the stored graphic once every label has been printed
+            self._file.write(f"^XA^ID{LOGO_GRAPHIC}^FS^XZ\n")
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def export_zpl(
+    product: dict,
+    path: str,
+    layout: str = "Vertical",
+    theme: str = "Light",
+    output_inches: Tuple[float, float] = (4.0, 3.0),
+    dpi: int = 203,
+    logo_path: str = "kii_logo.png",
+):
+    """Write a single-label ZPL file (logo upload included) to path."""
+    with ZplWriter(path, layout=layout, theme=theme, output_inches=output_inches, dpi=dpi,
+                   logo_path=logo_path) as writer:
+        writer.add_label(product)
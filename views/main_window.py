@@ -26,7 +26,7 @@ from PySide6.QtWidgets import (
     QToolButton
 )
 from PySide6.QtGui import QPixmap, QIcon, QAction, QPalette, QColor
-from PySide6.QtCore import Qt, QThread, QSize
+from PySide6.QtCore import Qt, QThread, QSize, QTimer
 
 from resources.styles import THEMES
 from controllers.main_controller import MainController
@@ -49,6 +49,8 @@ class ModernPreview(QLabel):
         self.setObjectName("preview")
         self.setAlignment(Qt.AlignCenter)
         self.setMinimumSize(720, 540)
+        # Rendered pixmap must not drive the layout: the preview is sized to fit this widget
+        self.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
         shadow = QGraphicsDropShadowEffect(self)
         shadow.setBlurRadius(18)
         shadow.setOffset(0, 8)
@@ -73,15 +75,18 @@ class MainWindow(QMainWindow):
         # Apply default theme
         self.apply_theme("Light")
 
-        # Initialize layout state in controller and render preview
+        # Initialize layout state in controller; the first preview is requested once the window
+        # is shown and laid out (showEvent), so it renders once, at the final preview size
         initial_layout = "Vertical" if self.layout_vertical.isChecked() else "Horizontal"
-        self.controller.on_layout_changed(initial_layout)
-        self.controller.on_form_changed()
+        self.controller.on_layout_changed(initial_layout, refresh=False)
+        self._first_preview_pending = True
 
         # Batch placeholders
         self._batch_thread: Optional[QThread] = None
         self._batch_worker = None
         self._batch_progress: Optional[QProgressDialog] = None
+        self._batch_status = ""
+        self._batch_last_skip = ""
 
     # ---------------- UI construction ----------------
     def _build_ui(self):
@@ -260,13 +265,17 @@ class MainWindow(QMainWindow):
         self.export_png_btn = QPushButton("Export PNG")
         self.export_jpg_btn = QPushButton("Export JPG")
         self.export_pdf_btn = QPushButton("Export PDF")
+        self.export_zpl_btn = QPushButton("Export ZPL")
+        self.export_zpl_btn.setToolTip("Zebra thermal printer label, laid out for the printer DPI chosen in Settings")
         export_row.addWidget(self.export_png_btn)
         export_row.addWidget(self.export_jpg_btn)
         export_row.addWidget(self.export_pdf_btn)
+        export_row.addWidget(self.export_zpl_btn)
         card_layout.addLayout(export_row)
         self.export_png_btn.clicked.connect(self.on_export_png)
         self.export_jpg_btn.clicked.connect(self.on_export_jpg)
         self.export_pdf_btn.clicked.connect(self.on_export_pdf)
+        self.export_zpl_btn.clicked.connect(self.on_export_zpl)
 
         # Settings & Batch
         bottom_row = QHBoxLayout()
@@ -320,18 +329,24 @@ class MainWindow(QMainWindow):
         return panel
 
     # ---------------- Preview & theme handling ----------------
-    def set_preview_qimage(self, qimage):
-        """Set the preview QImage (controller provides). Scales respecting zoom value."""
-        zoom = self.zoom_slider.value() / 100.0
+    def preview_zoom(self) -> float:
+        return self.zoom_slider.value() / 100.0
+
+    def preview_target_size(self):
+        """Logical pixel size the preview fits into (100% zoom) and the screen's device pixel ratio."""
+        rect = self.preview_widget.contentsRect()
+        return max(2, rect.width()), max(2, rect.height()), self.preview_widget.devicePixelRatioF()
+
+    def set_preview_qimage(self, qimage, output_px=None):
+        """Set the preview QImage (controller provides), already rendered at preview size and zoom."""
+        zoom = self.preview_zoom()
         pix = QPixmap.fromImage(qimage)
-        w = max(2, int(pix.width() * zoom))
-        h = max(2, int(pix.height() * zoom))
-        scaled = pix.scaled(w, h, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        self.preview_widget.setPixmap(scaled)
-        self.preview_info.setText(f"Preview ({int(zoom*100)}%) — {pix.width()}x{pix.height()} px")
+        self.preview_widget.setPixmap(pix)
+        w, h = output_px or (pix.width(), pix.height())
+        self.preview_info.setText(f"Preview ({int(zoom*100)}%) — {w}x{h} px")
 
     def _on_zoom_changed(self, _):
-        # Re-render a fresh QImage via controller and scale for preview
+        # Re-render the preview at the new zoom factor
         self.controller.on_form_changed()
 
     def apply_theme(self, theme_name: str):
@@ -422,6 +437,11 @@ class MainWindow(QMainWindow):
         except Exception:
             pass
 
+    def show_settings_dialog(self, settings):
+        dlg = SettingsDialog(self, settings)
+        if dlg.exec() == QDialog.Accepted:
+            self.controller.save_settings(*dlg.get_values())
+
     def set_status_message(self, msg: str, error: bool = False):
         self.status.showMessage(msg)
         if error:
@@ -469,6 +489,15 @@ class MainWindow(QMainWindow):
             if ok:
                 QMessageBox.information(self, "Export", f"PDF exported successfully:\n{os.path.basename(path)}")
 
+    def on_export_zpl(self):
+        part = self.part_number_input.text().strip() or "product_tag"
+        default = os.path.join(self.controller.default_output_folder, f"{part}.zpl")
+        path, _ = QFileDialog.getSaveFileName(self, "Export ZPL", default, "ZPL Files (*.zpl)")
+        if path:
+            ok = self.controller.export(path, "zpl")
+            if ok:
+                QMessageBox.information(self, "Export", f"ZPL exported successfully:\n{os.path.basename(path)}")
+
     def on_import_csv(self):
         csv_path, _ = QFileDialog.getOpenFileName(self, "Select CSV file", os.path.expanduser("~"), "CSV Files (*.csv)")
         if not csv_path:
@@ -491,11 +520,23 @@ class MainWindow(QMainWindow):
             self.layout_vertical.setChecked(True)
             self.controller.on_layout_changed("Vertical")
 
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._first_preview_pending:
+            self._first_preview_pending = False
+            # Queued so the layout has settled and preview_target_size() is final
+            QTimer.singleShot(0, self.controller.on_form_changed)
+
+    def closeEvent(self, event):
+        self.controller.shutdown()
+        super().closeEvent(event)
+
     def _show_about(self):
         QMessageBox.information(self, "About", "KII Product Tag Generator\nProfessional UI\nOffline • Cross-platform\nBuilt with PySide6")
 
     # ---------------- Batch lifecycle ----------------
     def batch_running(self, thread: QThread, worker):
+        self._batch_status = self._batch_last_skip = ""
         self._batch_thread = thread
         self._batch_worker = worker
         self._batch_progress = QProgressDialog("Running batch...", "Cancel", 0, 100, self)
@@ -503,18 +544,34 @@ class MainWindow(QMainWindow):
         self._batch_progress.canceled.connect(self._on_batch_cancel)
         self._batch_progress.show()
 
-    def update_batch_progress(self, pct: int):
+    def update_batch_progress(self, pct: int, status: str = ""):
         if self._batch_progress:
             self._batch_progress.setValue(pct)
+            self._batch_status = status
+            self._batch_progress.setLabelText(self._batch_label())
+
+    def batch_row_error(self, message: str):
+        self._batch_last_skip = message
+        if self._batch_progress:
+            self._batch_progress.setLabelText(self._batch_label())
+
+    def _batch_label(self) -> str:
+        text = "Running batch..."
+        if self._batch_status:
+            text += f"\n{self._batch_status}"
+        if self._batch_last_skip:
+            text += f"\nSkipped {self._batch_last_skip}"
+        return text
 
     def _on_batch_cancel(self):
-        if self._batch_thread and self._batch_thread.isRunning():
-            QMessageBox.information(self, "Cancel", "Batch cancellation requested. Current item will finish.")
-        else:
-            if self._batch_progress:
-                self._batch_progress.close()
+        if self._batch_worker is not None and self._batch_thread and self._batch_thread.isRunning():
+            # Honoured between rows; batch_finished reports what was exported before the stop
+            self._batch_worker.cancel()
+            self.set_status_message("Cancelling batch after the current rows...", error=False)
+        elif self._batch_progress:
+            self._batch_progress.close()
 
-    def batch_finished(self, results):
+    def batch_finished(self, results, cancelled: bool = False):
         if self._batch_progress:
             self._batch_progress.setValue(100)
             self._batch_progress.close()
@@ -523,9 +580,16 @@ class MainWindow(QMainWindow):
         self.setEnabled(True)
         success = sum(1 for r in results if r[1])
         failed = [r for r in results if not r[1]]
-        msg = f"Batch finished. Success: {success}. Failed: {len(failed)}"
+        msg = f"Batch {'cancelled' if cancelled else 'finished'}. Success: {success}. Failed: {len(failed)}"
+        from utils.csv_batch import DUPLICATE_MESSAGE, UNCHANGED_MESSAGE  # loaded by the batch that just ran
+        unchanged = sum(1 for r in results if r[2] == UNCHANGED_MESSAGE)
+        if unchanged:
+            msg += f"\n{unchanged} tags were already up to date and were not rendered again."
+        duplicates = sum(1 for r in results if r[2] == DUPLICATE_MESSAGE)
+        if duplicates:
+            msg += f"\n{duplicates} rows repeated an earlier row and reused its tag ({duplicates} renders saved)."
         if failed:
-            details = "\n".join(f"{os.path.basename(p)}: {m}" for p, ok, m in failed[:10])
+            details = "\n".join(f"{os.path.basename(p)}: {m}" for p, ok, m, _ in failed[:10])
             if len(failed) > 10:
                 details += f"\n...and {len(failed)-10} more."
             QMessageBox.warning(self, "Batch Results", f"{msg}\n\nErrors (first 10):\n{details}")
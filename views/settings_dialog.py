@@ -1,13 +1,34 @@
 """
-Settings dialog UI: configure output size (inches), DPI, default format, default output folder.
+Settings dialog UI: configure output size (inches), DPI, default format, default output folder,
+PNG/JPEG encoding and batch options.
 Uses AppSettings through controller to persist.
 """
 from PySide6.QtWidgets import (
-    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QSpinBox, QComboBox, QPushButton, QFileDialog
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QSpinBox, QComboBox, QPushButton, QFileDialog,
+    QCheckBox
 )
 from PySide6.QtCore import Qt
 import os
 
+from models.settings import PRINTER_DPIS
+
+# Encoder profiles of utils.exporter.ENCODER_PROFILES (not imported here: it would load the exporter)
+ENCODER_CHOICES = (
+    ("lossless", "Lossless RGB at standard compression (default)"),
+    ("fast", "Lossless, quickest to write, largest files"),
+    ("balanced", "256-colour palette: about as quick as fast, files ~2.5x smaller"),
+    ("smallest", "256-colour palette at maximum compression: smallest colour files, slowest"),
+    ("monochrome", "1-bit for Light/Industrial themes: text, frame, lines and QC dot all print black"),
+)
+
+# Batch targets: separate files, or an archive of utils.batch_archive.ARCHIVE_FORMATS
+ARCHIVE_CHOICES = (
+    (None, "Separate files"),
+    ("zip", "ZIP archive"),
+    ("zip-deflated", "ZIP archive (deflated)"),
+    ("tar", "tar archive"),
+)
+
 class SettingsDialog(QDialog):
     def __init__(self, parent=None, settings=None):
         super().__init__(parent)
@@ -44,10 +65,30 @@ class SettingsDialog(QDialog):
         h3 = QHBoxLayout()
         h3.addWidget(QLabel("Default export format:"))
         self.format_combo = QComboBox()
-        self.format_combo.addItems(["pdf","png","jpg"])
+        self.format_combo.addItems(["pdf","png","jpg","zpl"])
         h3.addWidget(self.format_combo)
         layout.addLayout(h3)
 
+        # ZPL is laid out in printer dots, independent of the raster export DPI
+        h3a = QHBoxLayout()
+        h3a.addWidget(QLabel("Zebra printer DPI (ZPL):"))
+        self.printer_dpi_combo = QComboBox()
+        for value in PRINTER_DPIS:
+            self.printer_dpi_combo.addItem(str(value), value)
+        self.printer_dpi_combo.setToolTip("Print head resolution of the thermal printer ZPL labels are sent to")
+        h3a.addWidget(self.printer_dpi_combo)
+        layout.addLayout(h3a)
+
+        # PNG/JPEG encoder profile
+        h3b = QHBoxLayout()
+        h3b.addWidget(QLabel("PNG/JPEG encoding:"))
+        self.encoder_combo = QComboBox()
+        for name, tip in ENCODER_CHOICES:
+            self.encoder_combo.addItem(name)
+            self.encoder_combo.setItemData(self.encoder_combo.count() - 1, tip, Qt.ToolTipRole)
+        h3b.addWidget(self.encoder_combo)
+        layout.addLayout(h3b)
+
         # Default output folder
         h4 = QHBoxLayout()
         h4.addWidget(QLabel("Default output folder:"))
@@ -57,6 +98,27 @@ class SettingsDialog(QDialog):
         h4.addWidget(self.browse_btn)
         layout.addLayout(h4)
 
+        # Batch options
+        self.single_pdf_check = QCheckBox("Combine PDF batches into one multi-page PDF")
+        self.single_pdf_check.setToolTip("Pages are painted like the PNG/JPG export (app fonts); "
+                                         "per-row PDFs use the PDF standard fonts")
+        layout.addWidget(self.single_pdf_check)
+        h5 = QHBoxLayout()
+        h5.addWidget(QLabel("Batch worker processes:"))
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, 128)
+        self.workers_spin.setValue(os.cpu_count() or 1)
+        h5.addWidget(self.workers_spin)
+        layout.addLayout(h5)
+        h6 = QHBoxLayout()
+        h6.addWidget(QLabel("Batch PNG/JPG/PDF output:"))
+        self.archive_combo = QComboBox()
+        for kind, label in ARCHIVE_CHOICES:
+            self.archive_combo.addItem(label, kind)
+        self.archive_combo.setToolTip("An archive is one file named after the CSV, with a manifest.jsonl of rows")
+        h6.addWidget(self.archive_combo)
+        layout.addLayout(h6)
+
         # Buttons
         btn_h = QHBoxLayout()
         self.save_btn = QPushButton("Save")
@@ -79,7 +141,12 @@ class SettingsDialog(QDialog):
         self.height_input.setText(str(h))
         self.dpi_spin.setValue(self.settings.get_dpi())
         self.format_combo.setCurrentText(self.settings.get_default_format())
+        self.encoder_combo.setCurrentText(self.settings.get_encoder_profile())
+        self.printer_dpi_combo.setCurrentIndex(max(0, self.printer_dpi_combo.findData(self.settings.get_printer_dpi())))
         self.folder_input.setText(self.settings.get_default_output_folder() or os.path.expanduser("~"))
+        self.single_pdf_check.setChecked(self.settings.get_batch_single_pdf())
+        self.workers_spin.setValue(self.settings.get_batch_workers())
+        self.archive_combo.setCurrentIndex(max(0, self.archive_combo.findData(self.settings.get_batch_archive())))
 
     def _on_browse(self):
         folder = QFileDialog.getExistingDirectory(self, "Select default output folder", os.path.expanduser("~"))
@@ -95,4 +162,9 @@ class SettingsDialog(QDialog):
         dpi = int(self.dpi_spin.value())
         fmt = self.format_combo.currentText()
         folder = self.folder_input.text().strip() or os.path.expanduser("~")
-        return w, h, dpi, fmt, folder
\ No newline at end of file
+        single_pdf = self.single_pdf_check.isChecked()
+        workers = int(self.workers_spin.value())
+        encoder = self.encoder_combo.currentText()
+        archive = self.archive_combo.currentData()
+        printer_dpi = int(self.printer_dpi_combo.currentData())
+        return w, h, dpi, fmt, folder, single_pdf, workers, encoder, archive, printer_dpi
\ No newline at end of file